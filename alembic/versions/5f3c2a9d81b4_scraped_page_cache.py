@@ -0,0 +1,58 @@
+"""scraped page cache
+
+Revision ID: 5f3c2a9d81b4
+Revises: 78bc6b9c47d7
+Create Date: 2026-10-18 10:12:41.208311
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5f3c2a9d81b4"
+down_revision: Union[str, Sequence[str], None] = "78bc6b9c47d7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "scraped_pages",
+        sa.Column("url_hash", sa.String(length=32), primary_key=True, nullable=False),
+        sa.Column("url", sa.Text(), nullable=False),
+        sa.Column("title", sa.String(), nullable=True),
+        sa.Column("snippet", sa.Text(), nullable=True),
+        sa.Column("content", sa.Text(), nullable=True),
+        sa.Column("etag", sa.String(), nullable=True),
+        sa.Column("last_modified", sa.String(), nullable=True),
+        sa.Column(
+            "fetched_at",
+            sa.TIMESTAMP(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.Column("expires_at", sa.TIMESTAMP(timezone=True), nullable=False),
+        if_not_exists=True,
+    )
+
+    op.create_index(
+        "ix_scraped_pages_expires_at",
+        "scraped_pages",
+        ["expires_at"],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_scraped_pages_expires_at",
+        table_name="scraped_pages",
+        if_exists=True,
+    )
+    op.drop_table("scraped_pages", if_exists=True)
@@ -0,0 +1,59 @@
+"""message and thread indexes
+
+Revision ID: b81e4c7d2a90
+Revises: 5f3c2a9d81b4
+Create Date: 2026-10-18 14:05:12.480127
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b81e4c7d2a90"
+down_revision: Union[str, Sequence[str], None] = "5f3c2a9d81b4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (name, table, columns), `id` breaks ties of equal timestamps for keyset paging
+INDEXES = [
+    (
+        "ix_messages_conversation_id_created_at",
+        "messages",
+        ["conversation_id", "created_at", "id"],
+    ),
+    ("ix_messages_parent_id", "messages", ["parent_id"]),
+    (
+        "ix_conversation_threads_updated_at",
+        "conversation_threads",
+        ["updated_at", "id"],
+    ),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY does not lock writes on a live table but cannot run inside
+    # the migration transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
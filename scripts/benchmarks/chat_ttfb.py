@@ -0,0 +1,199 @@
+"""
+Benchmark: time to the first SSE byte of /chat/completions.
+
+Default mode times the database work the handler does before it starts
+streaming, two `create_message` calls (commit + refresh each) versus one
+`create_turn`, against the configured Postgres (the thread is deleted
+afterwards). It also sends a normal, a follow-up and a regenerate request
+body through the handler's `create_chat_turn` and checks that the answer of a
+turn is listed after its question:
+
+    python scripts/benchmarks/chat_ttfb.py --repeat 200
+
+With `--url` it times the first response byte of a running server instead
+(run it against the build before and after the change, every request starts
+an agent run that is abandoned after the first byte):
+
+    python scripts/benchmarks/chat_ttfb.py --url http://localhost:8000/api/v1 --repeat 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, List, Optional, Tuple
+from uuid import UUID
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import httpx
+from sqlalchemy import delete
+
+from src.database.connection import AsyncSessionLocal, engine
+from src.database.model import ConversationThread, Message
+from src.search import crud
+from src.search import types as search_types
+
+QUERY = "how do I size a postgres connection pool?"
+CONTEXT = {"type": search_types.FlowType.NORMAL.value}
+
+
+def report(name: str, samples: List[float]) -> None:
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(
+        f"{name:<18} p50 {statistics.median(samples):>7.2f} ms  "
+        f"p95 {p95:>7.2f} ms  mean {statistics.mean(samples):>7.2f} ms"
+    )
+
+
+async def timed(step: Callable[[], Awaitable[None]], repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await step()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+async def chat_turn(
+    thread_id: UUID, payload: dict
+) -> Tuple[Optional[Message], Message]:
+    # validated like the /chat/completions request body
+    body = search_types.ConversationAPIRequest.model_validate(
+        {"query": QUERY, **payload}
+    )
+    return await crud.create_chat_turn(thread_id=thread_id, body=body)
+
+
+async def check_chat_turns(thread_id: UUID) -> None:
+    user_message, ai_message = await chat_turn(
+        thread_id, {"parent_message_id": None, "context": CONTEXT}
+    )
+    async with AsyncSessionLocal() as db:
+        _, messages, _ = await crud.list_conversations(
+            db=db,
+            thread_id=thread_id,
+            page=1,
+            page_size=2,
+            total=search_types.TotalCount.NONE,
+        )
+    if [message.id for message in messages] != [user_message.id, ai_message.id]:
+        sys.exit("create_turn: the assistant message is listed before its question")
+    print("ok    normal turn, answer listed after its question")
+
+    follow_up, _ = await chat_turn(
+        thread_id,
+        {
+            "parent_message_id": str(ai_message.id),
+            "context": {"type": search_types.FlowType.FOLLOW_UP.value, "text": QUERY},
+        },
+    )
+    if follow_up is None or follow_up.parent_id != ai_message.id:
+        sys.exit("create_chat_turn: follow-up turn without its user message")
+    print("ok    follow-up turn")
+
+    regenerated_user, regenerated = await chat_turn(
+        thread_id,
+        {
+            "parent_message_id": str(ai_message.id),
+            "context": {
+                "type": search_types.FlowType.REGENERATE.value,
+                "um_id": str(user_message.id),
+            },
+        },
+    )
+    if regenerated_user is not None or regenerated.parent_id != user_message.id:
+        sys.exit("create_chat_turn: regenerate did not answer the previous question")
+    print("ok    regenerate turn")
+
+
+async def database_mode(repeat: int) -> None:
+    async with AsyncSessionLocal() as db:
+        thread = await crud.create_thread(
+            db=db, body=search_types.APIRequest(query="chat ttfb benchmark")
+        )
+    try:
+
+        async def create_messages() -> None:
+            user_message = await crud.create_message(
+                thread_id=thread.id,
+                role=search_types.MessageRole.USER,
+                parent_message_id=None,
+                query=QUERY,
+                follow_context=CONTEXT,
+            )
+            await crud.create_message(
+                thread_id=thread.id,
+                role=search_types.MessageRole.ASSISTANT,
+                parent_message_id=user_message.id,
+                follow_context=CONTEXT,
+            )
+
+        async def create_turn() -> None:
+            await crud.create_turn(
+                thread_id=thread.id,
+                query=QUERY,
+                parent_message_id=None,
+                follow_context=CONTEXT,
+            )
+
+        # warm up the connection pool and the statement caches
+        await timed(create_messages, 5)
+        await timed(create_turn, 5)
+        report("2x create_message", await timed(create_messages, repeat))
+        report("create_turn", await timed(create_turn, repeat))
+        await check_chat_turns(thread.id)
+    finally:
+        # messages cascade, no checkpoints were written
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                delete(ConversationThread).where(ConversationThread.id == thread.id)
+            )
+            await db.commit()
+        await engine.dispose()
+
+
+async def http_mode(url: str, repeat: int) -> None:
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        response = await client.post("/thread/", json={"query": "chat ttfb benchmark"})
+        response.raise_for_status()
+        thread_id = response.json()["data"]["id"]
+        try:
+
+            async def first_byte() -> None:
+                async with client.stream(
+                    "POST",
+                    f"/thread/{thread_id}/chat/completions",
+                    json={
+                        "query": QUERY,
+                        "parent_message_id": None,
+                        "context": CONTEXT,
+                    },
+                ) as response:
+                    response.raise_for_status()
+                    async for _ in response.aiter_raw():
+                        break
+
+            report("first SSE byte", await timed(first_byte, repeat))
+        finally:
+            await client.delete(f"/thread/{thread_id}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument(
+        "--url", help="base url of a running server (api prefix included)"
+    )
+    args = parser.parse_args()
+    if args.url:
+        asyncio.run(http_mode(url=args.url, repeat=args.repeat))
+    else:
+        asyncio.run(database_mode(repeat=args.repeat))
@@ -0,0 +1,112 @@
+"""
+Benchmark: bytes stored and serialize/deserialize time per checkpoint with
+the AES encrypted serializer, with and without zstd compression before
+encryption (synthetic research thread, no database needed).
+
+    python scripts/benchmarks/checkpoint_serde.py --pages 5 --repeat 50
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.encrypted import EncryptedSerializer
+
+from src.commonlib.checkpoint_serde import ZstdSerializer
+
+WORDS = (
+    "postgres connection pool checkpoint serializer agent thread message tool "
+    "search result markdown section paragraph latency throughput concurrency"
+).split()
+
+
+def make_page(rng: random.Random, index: int) -> str:
+    sections = []
+    for section in range(10):
+        paragraphs = [
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 90)))
+            for _ in range(rng.randint(2, 4))
+        ]
+        sections.append(f"## Section {index}.{section}\n\n" + "\n\n".join(paragraphs))
+    return "\n\n".join(sections)
+
+
+def make_channel_values(pages: int) -> Dict[str, Any]:
+    rng = random.Random(42)
+    content = "\n\n".join(
+        f"title: Page {i}, \nlink: https://example{i}.com, \ncontent: {make_page(rng, i)}"
+        for i in range(pages)
+    )
+    return {
+        "messages": [
+            HumanMessage(content="how do I size a postgres connection pool?"),
+            AIMessage(
+                content="",
+                tool_calls=[
+                    {
+                        "name": "internet_search",
+                        "args": {"query": "postgres connection pool sizing"},
+                        "id": "call_1",
+                    }
+                ],
+            ),
+            ToolMessage(content=content, name="internet_search", tool_call_id="call_1"),
+            AIMessage(content=make_page(rng, pages)),
+        ]
+    }
+
+
+def measure(name: str, serde: SerializerProtocol, values: Dict[str, Any], repeat: int):
+    stored = [serde.dumps_typed(value) for value in values.values()]
+    size = sum(len(data) for _, data in stored)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for value in values.values():
+            serde.dumps_typed(value)
+    dumps_ms = (time.perf_counter() - start) * 1000 / repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for typed in stored:
+            serde.loads_typed(typed)
+    loads_ms = (time.perf_counter() - start) * 1000 / repeat
+
+    print(
+        f"{name:<18} {size:>10,} B  dumps {dumps_ms:>7.2f} ms  loads {loads_ms:>7.2f} ms"
+        f"  type {stored[0][0]}"
+    )
+    return size
+
+
+def main(pages: int, repeat: int) -> None:
+    values = make_channel_values(pages)
+    encrypted = EncryptedSerializer.from_pycryptodome_aes()
+    compressed = EncryptedSerializer.from_pycryptodome_aes(serde=ZstdSerializer())
+
+    before = measure("aes", encrypted, values, repeat)
+    after = measure("zstd + aes", compressed, values, repeat)
+    print(f"stored bytes: {after / before:.1%} of the uncompressed checkpoint")
+
+    # rows written before compression was enabled stay readable
+    typed = encrypted.dumps_typed(values["messages"])
+    assert compressed.loads_typed(typed) == values["messages"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    main(pages=args.pages, repeat=args.repeat)
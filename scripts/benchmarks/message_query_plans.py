@@ -0,0 +1,183 @@
+"""
+Query-plan check: seeds a million messages (inside a transaction that is
+rolled back), runs EXPLAIN on the thread/message hot-path queries and fails
+when one of them does not use its index.
+
+    python scripts/benchmarks/message_query_plans.py --threads 20000 --messages-per-thread 50
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Iterator, List, Set
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from sqlalchemy import func, literal_column, select, text, tuple_
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.sql import Executable
+
+from src.database.connection import engine
+from src.database.model import ConversationThread, Message
+from src.search.crud import ACTIVE_PATH_SQL
+
+# deterministic ids, message `n` answers message `n - 1` of the same thread
+SEED_THREADS_SQL = """
+INSERT INTO conversation_threads (id, title, created_at, updated_at)
+SELECT md5('thread:' || t)::uuid, 'thread ' || t,
+       now() - t * interval '1 minute', now() - t * interval '1 minute'
+FROM generate_series(1, :threads) t
+"""
+
+SEED_MESSAGES_SQL = """
+INSERT INTO messages (id, conversation_id, parent_id, role, content, created_at, updated_at)
+SELECT md5('message:' || t || ':' || m)::uuid,
+       md5('thread:' || t)::uuid,
+       CASE WHEN m > 1 THEN md5('message:' || t || ':' || (m - 1))::uuid END,
+       (CASE WHEN m % 2 = 1 THEN 'user' ELSE 'assistant' END)::message_role,
+       repeat('synthetic message ', 20),
+       now() - t * interval '1 minute' + m * interval '1 second',
+       now() - t * interval '1 minute' + m * interval '1 second'
+FROM generate_series(1, :threads) t, generate_series(1, :messages) m
+"""
+
+
+def seeded_id(kind: str, *parts: int) -> str:
+    key = ":".join([kind, *map(str, parts)])
+    return f"md5('{key}')::uuid"
+
+
+def checks(threads: int, messages: int) -> Iterator[tuple]:
+    thread_id = literal_column(seeded_id("thread", threads // 2))
+    message_id = literal_column(seeded_id("message", threads // 2, messages // 2))
+    yield (
+        "list_conversations page",
+        select(Message)
+        .where(Message.conversation_id == thread_id)
+        .order_by(Message.created_at.desc())
+        .limit(20),
+        {"ix_messages_conversation_id_created_at"},
+    )
+    yield (
+        "list_conversations count",
+        select(func.count(Message.id)).where(Message.conversation_id == thread_id),
+        {"ix_messages_conversation_id_created_at"},
+    )
+    yield (
+        "get_message",
+        select(Message).where(
+            Message.id == message_id, Message.conversation_id == thread_id
+        ),
+        # the first migration also indexed the primary key as ix_messages_id
+        {"messages_pkey", "ix_messages_id"},
+    )
+    yield (
+        "message children",
+        select(Message).where(Message.parent_id == message_id),
+        {"ix_messages_parent_id"},
+    )
+    yield (
+        "list_conversations keyset",
+        select(Message)
+        .where(
+            Message.conversation_id == thread_id,
+            tuple_(Message.created_at, Message.id)
+            < tuple_(literal_column("now()"), message_id),
+        )
+        .order_by(Message.created_at.desc(), Message.id.desc())
+        .limit(21),
+        {"ix_messages_conversation_id_created_at"},
+    )
+    yield (
+        "list_threads keyset",
+        select(ConversationThread)
+        .where(
+            tuple_(ConversationThread.updated_at, ConversationThread.id)
+            < tuple_(literal_column("now() - interval '1 day'"), thread_id)
+        )
+        .order_by(ConversationThread.updated_at.desc(), ConversationThread.id.desc())
+        .limit(11),
+        {"ix_conversation_threads_updated_at"},
+    )
+    yield (
+        "active path",
+        text(
+            ACTIVE_PATH_SQL.replace(":thread_id", str(thread_id)).replace(
+                ":leaf_id", seeded_id("message", threads // 2, messages)
+            )
+        ),
+        {"ix_messages_parent_id"},
+    )
+    yield (
+        "list_threads page",
+        select(ConversationThread)
+        .order_by(ConversationThread.updated_at.desc())
+        .limit(10),
+        {"ix_conversation_threads_updated_at"},
+    )
+
+
+def index_names(plan: dict) -> Set[str]:
+    names = {plan["Index Name"]} if "Index Name" in plan else set()
+    for child in plan.get("Plans", []):
+        names |= index_names(child)
+    return names
+
+
+async def explain(conn: AsyncConnection, statement: Executable) -> dict:
+    sql = statement.compile(
+        dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+    )
+    result = await conn.execute(text(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}"))
+    plan = result.scalar()
+    return (json.loads(plan) if isinstance(plan, str) else plan)[0]
+
+
+async def main(threads: int, messages: int) -> None:
+    failures: List[str] = []
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        try:
+            start = time.perf_counter()
+            await conn.execute(text(SEED_THREADS_SQL), {"threads": threads})
+            await conn.execute(
+                text(SEED_MESSAGES_SQL), {"threads": threads, "messages": messages}
+            )
+            await conn.execute(text("ANALYZE conversation_threads, messages"))
+            print(
+                f"seeded {threads * messages:,} messages in "
+                f"{time.perf_counter() - start:.1f} s"
+            )
+
+            for name, statement, expected in checks(threads, messages):
+                plan = await explain(conn, statement)
+                used = index_names(plan["Plan"])
+                ok = bool(expected & used)
+                print(
+                    f"{'ok' if ok else 'FAIL':<5} {name:<26} "
+                    f"{plan['Execution Time']:>8.2f} ms  indexes: {sorted(used)}"
+                )
+                if not ok:
+                    failures.append(f"{name}: expected one of {sorted(expected)}")
+        finally:
+            await transaction.rollback()
+    await engine.dispose()
+
+    if failures:
+        sys.exit("\n".join(failures))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=20_000)
+    parser.add_argument("--messages-per-thread", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(threads=args.threads, messages=args.messages_per_thread))
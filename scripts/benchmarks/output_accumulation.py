@@ -0,0 +1,108 @@
+"""
+Benchmark: accumulating a long streamed answer (50k tokens) with `str +=` per
+token versus appending to a list and joining once, plus the former
+json.dumps/json.loads round-trip of the sources (no network needed).
+
+CPython can sometimes grow a string held only by a local variable in place,
+the `attribute +=` row shows the cost once that shortcut does not apply (any
+other reference to the string, an attribute, another interpreter).
+
+    python scripts/benchmarks/output_accumulation.py --tokens 50000
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from src.search import types as search_types
+
+WORDS = "the pool hands out sessions to concurrent requests and returns them".split()
+
+
+class Accumulator:
+    output = ""
+
+
+def make_tokens(count: int) -> List[str]:
+    rng = random.Random(42)
+    return [" " + rng.choice(WORDS) for _ in range(count)]
+
+
+def make_sources(count: int = 10) -> List[search_types.Source]:
+    return [
+        search_types.Source(
+            title=f"Source {i}",
+            link=f"https://example{i}.com/article",
+            snippet="synthetic source " * 10,
+        )
+        for i in range(count)
+    ]
+
+
+def local_concat(tokens: List[str]) -> str:
+    output = ""
+    for token in tokens:
+        output += token
+    return output
+
+
+def attribute_concat(tokens: List[str]) -> str:
+    accumulator = Accumulator()
+    for token in tokens:
+        accumulator.output += token
+    return accumulator.output
+
+
+def list_join(tokens: List[str]) -> str:
+    parts: List[str] = []
+    for token in tokens:
+        parts.append(token)
+    return "".join(parts)
+
+
+def timed(function: Callable[[], object], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main(tokens: int, repeat: int) -> None:
+    stream = make_tokens(tokens)
+    sources = make_sources()
+    print(f"tokens: {tokens}, answer size: {sum(map(len, stream)):,} chars")
+
+    for name, accumulate in (
+        ("local +=", local_concat),
+        ("attribute +=", attribute_concat),
+        ("list + join", list_join),
+    ):
+        print(f"{name:<16} {timed(lambda: accumulate(stream), repeat):>10.2f} ms")
+
+    def json_round_trip() -> list:
+        message = json.dumps([source.model_dump(mode="json") for source in sources])
+        return json.loads(message)
+
+    def typed() -> list:
+        return list(sources)
+
+    print(f"{'sources json':<16} {timed(json_round_trip, repeat) * 1000:>10.1f} us")
+    print(f"{'sources typed':<16} {timed(typed, repeat) * 1000:>10.1f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    main(tokens=args.tokens, repeat=args.repeat)
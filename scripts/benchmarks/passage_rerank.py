@@ -0,0 +1,80 @@
+"""
+Benchmark: tokens sent to the LLM by internet_search before and after
+BM25 passage reranking (synthetic pages, no network needed).
+
+    python scripts/benchmarks/passage_rerank.py
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from src.search import types as search_types
+from src.search.agents.context_packing import count_tokens, format_source, pack_sources
+from src.search.agents.passage_ranking import rerank_sources
+
+QUERY = "postgres connection pool exhaustion under concurrent load"
+FILLER = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+    "incididunt ut labore et dolore magna aliqua ut enim ad minim veniam quis nostrud"
+).split()
+RELEVANT = (
+    "When every connection in the postgres pool is checked out, new requests queue "
+    "until pool_timeout expires, so concurrent load turns into latency. Size the pool "
+    "for the expected concurrency and watch the pool exhaustion metrics."
+)
+
+
+def make_page(rng: random.Random, index: int) -> search_types.CompleteSource:
+    sections = []
+    for section in range(12):
+        paragraphs = [
+            " ".join(rng.choice(FILLER) for _ in range(rng.randint(60, 120)))
+            for _ in range(rng.randint(2, 5))
+        ]
+        if rng.random() < 0.15:
+            paragraphs.insert(rng.randint(0, len(paragraphs)), RELEVANT)
+        sections.append(f"## Section {section}\n\n" + "\n\n".join(paragraphs))
+
+    return search_types.CompleteSource(
+        title=f"Page {index}",
+        link=f"https://example{index}.com/article",
+        snippet="synthetic page",
+        content="\n\n".join(sections),
+    )
+
+
+def main(pages: int = 10) -> None:
+    rng = random.Random(42)
+    sources = [make_page(rng, i) for i in range(pages)]
+
+    start = time.perf_counter()
+    before = sum(count_tokens(format_source(source)) for source in sources)
+    packed = sum(count_tokens(part) for part in pack_sources(sources=sources))
+
+    rerank_start = time.perf_counter()
+    reranked, relevance = rerank_sources(query=QUERY, sources=sources)
+    rerank_ms = (time.perf_counter() - rerank_start) * 1000
+    after = sum(
+        count_tokens(part)
+        for part in pack_sources(sources=reranked, relevance=relevance)
+    )
+    total_ms = (time.perf_counter() - start) * 1000
+
+    print(f"pages:                      {pages}")
+    print(f"tokens, whole pages:        {before}")
+    print(f"tokens, packed:             {packed}")
+    print(f"tokens, reranked + packed:  {after} ({after / before:.1%} of whole pages)")
+    print(f"bm25 rerank time:           {rerank_ms:.1f} ms")
+    print(f"total benchmark time:       {total_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark: bytes on the wire and encoding CPU per 1k response tokens, current
+JSON SSE format versus the compact format (no network needed).
+
+    python scripts/benchmarks/sse_wire_format.py --tokens 1000 --repeat 50
+"""
+
+import argparse
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from src.search import types as search_types
+from src.search.agents.sse import DONE_MESSAGE, SseEncoder, get_sse_encoder
+
+WORDS = (
+    "the connection pool hands out sessions to concurrent requests and returns "
+    "them when the response is streamed back to the client over server sent events"
+).split()
+
+
+def make_events(tokens: int) -> List[search_types.SseEvent]:
+    rng = random.Random(42)
+    ids = {
+        "thread_id": uuid.uuid4(),
+        "track_id": uuid.uuid4(),
+        "um_id": uuid.uuid4(),
+        "aim_id": uuid.uuid4(),
+    }
+    events = [
+        search_types.SseEvent(
+            mode=search_types.SseMode.RESPONSE,
+            message=(" " if i else "") + rng.choice(WORDS),
+            **ids,
+        )
+        for i in range(tokens)
+    ]
+    events.append(
+        search_types.SseEvent(
+            mode=search_types.SseMode.RESPONSE, message=DONE_MESSAGE, **ids
+        )
+    )
+    return events
+
+
+def encode_stream(encoder: SseEncoder, events: List[search_types.SseEvent]) -> int:
+    size = len(encoder.open() or b"")
+    for event in events:
+        size += len(encoder.encode(event))
+    return size
+
+
+def measure(
+    name: str, encode: Callable[[], int], tokens: int, repeat: int
+) -> tuple[int, float]:
+    size = encode()
+    start = time.process_time()
+    for _ in range(repeat):
+        encode()
+    cpu_ms = (time.process_time() - start) * 1000 / repeat * 1000 / tokens
+    bytes_per_1k = size * 1000 / tokens
+    print(
+        f"{name:<10} {bytes_per_1k:>12,.0f} B/1k tokens {cpu_ms:>10.2f} ms cpu/1k tokens"
+    )
+    return size, cpu_ms
+
+
+def main(tokens: int, repeat: int) -> None:
+    events = make_events(tokens)
+    first = events[0]
+    ids = {
+        "thread_id": first.thread_id,
+        "track_id": first.track_id,
+        "um_id": first.um_id,
+        "aim_id": first.aim_id,
+    }
+
+    results = {}
+    for wire_format in search_types.SseWireFormat:
+        encoder = get_sse_encoder(wire_format=wire_format, **ids)
+        results[wire_format] = measure(
+            wire_format.value,
+            lambda: encode_stream(encoder, events),
+            tokens,
+            repeat,
+        )
+
+    json_size, json_cpu = results[search_types.SseWireFormat.JSON]
+    compact_size, compact_cpu = results[search_types.SseWireFormat.COMPACT]
+    print(
+        f"compact is {compact_size / json_size:.1%} of the bytes and "
+        f"{compact_cpu / json_cpu:.1%} of the cpu"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    main(tokens=args.tokens, repeat=args.repeat)
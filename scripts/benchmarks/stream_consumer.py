@@ -0,0 +1,116 @@
+"""
+Micro-benchmark: CPU cost of idle-ish SSE streams with the former polling
+consumer (`wait_for(queue.get(), 0.5)` + `is_disconnected()` per loop) versus
+the event-driven consumer (one `http.disconnect` receive task racing the queue).
+
+    python scripts/benchmarks/stream_consumer.py --streams 1000 --seconds 10
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Callable, List
+
+DONE = object()
+
+
+class FakeRequest:
+    """Minimal stand-in for starlette's Request receive channel."""
+
+    def __init__(self):
+        self._disconnect = asyncio.Event()
+
+    async def receive(self) -> dict:
+        await self._disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def is_disconnected(self) -> bool:
+        # starlette checks the receive channel without blocking
+        await asyncio.sleep(0)
+        return self._disconnect.is_set()
+
+    def disconnect(self) -> None:
+        self._disconnect.set()
+
+
+async def producer(queue: asyncio.Queue, seconds: float, interval: float) -> None:
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        await asyncio.sleep(interval)
+        await queue.put("token")
+    await queue.put(DONE)
+
+
+async def polling_consumer(request: FakeRequest, queue: asyncio.Queue) -> int:
+    received = 0
+    while True:
+        if await request.is_disconnected():
+            return received
+        try:
+            chunk = await asyncio.wait_for(queue.get(), timeout=0.5)
+        except asyncio.TimeoutError:
+            continue
+        if chunk is DONE:
+            return received
+        received += 1
+
+
+async def event_driven_consumer(request: FakeRequest, queue: asyncio.Queue) -> int:
+    received = 0
+    consumer = asyncio.current_task()
+
+    async def disconnect_watcher():
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            consumer.cancel()
+
+    watcher = asyncio.create_task(disconnect_watcher())
+    try:
+        while True:
+            chunk = await queue.get()
+            if chunk is DONE:
+                return received
+            received += 1
+    finally:
+        watcher.cancel()
+
+
+async def run(consumer: Callable, streams: int, seconds: float, interval: float):
+    requests = [FakeRequest() for _ in range(streams)]
+    queues: List[asyncio.Queue] = [asyncio.Queue(maxsize=100) for _ in range(streams)]
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    await asyncio.gather(
+        *(producer(queue, seconds, interval) for queue in queues),
+        *(consumer(request, queue) for request, queue in zip(requests, queues)),
+    )
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    return cpu, wall
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--streams", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument(
+        "--interval", type=float, default=2.0, help="seconds between tokens"
+    )
+    args = parser.parse_args()
+
+    for name, consumer in (
+        ("polling", polling_consumer),
+        ("event-driven", event_driven_consumer),
+    ):
+        cpu, wall = asyncio.run(
+            run(consumer, args.streams, args.seconds, args.interval)
+        )
+        print(
+            f"{name:>13}: cpu {cpu:.3f}s over {wall:.1f}s wall, "
+            f"{cpu / args.streams * 1000:.3f} ms cpu per stream"
+        )
+
+
+if __name__ == "__main__":
+    main()
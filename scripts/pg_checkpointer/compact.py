@@ -0,0 +1,76 @@
+"""
+Compact the LangGraph checkpoint tables: keep the last N checkpoints per
+thread, prune orphaned blobs/writes and expire threads idle beyond a TTL.
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+from psycopg import AsyncConnection
+from psycopg.rows import dict_row
+
+# Add parent directory to path to import src modules
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from dotenv import load_dotenv
+
+from src.commonlib.checkpoint_compaction import compact_checkpoints
+from src.commonlib.config import settings
+
+# load environment variables from .env file
+load_dotenv()
+
+
+async def checkpointer_compact(args: argparse.Namespace) -> None:
+    async with await AsyncConnection.connect(
+        settings.psycopg_dsn_checkpoint,
+        autocommit=True,
+        prepare_threshold=0,
+        row_factory=dict_row,
+    ) as conn:
+        print("Compacting checkpointer tables...")
+        report = await compact_checkpoints(
+            conn,
+            keep_last=args.keep_last,
+            ttl_seconds=args.ttl_days * 24 * 60 * 60 if args.ttl_days else None,
+            min_idle_seconds=args.min_idle_seconds,
+            batch_size=args.batch_size,
+        )
+        print(f"Checkpointer tables compacted: {report.model_dump()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--keep-last",
+        type=int,
+        default=settings.CHECKPOINT_KEEP_LAST,
+        help="checkpoints kept per thread",
+    )
+    parser.add_argument(
+        "--ttl-days",
+        type=float,
+        default=(
+            settings.CHECKPOINT_THREAD_TTL_SECONDS / (24 * 60 * 60)
+            if settings.CHECKPOINT_THREAD_TTL_SECONDS
+            else 0
+        ),
+        help="delete the checkpoints of threads idle for longer (0 = never)",
+    )
+    parser.add_argument(
+        "--min-idle-seconds",
+        type=float,
+        default=settings.CHECKPOINT_COMPACTION_MIN_IDLE_SECONDS,
+        help="skip threads with a newer checkpoint",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=settings.CHECKPOINT_COMPACTION_BATCH_SIZE,
+        help="threads per transaction",
+    )
+    asyncio.run(checkpointer_compact(parser.parse_args()))
+
+# python scripts/pg_checkpointer/compact.py --keep-last 20 --ttl-days 90
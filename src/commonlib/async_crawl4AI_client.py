@@ -1,49 +1,98 @@
+import asyncio
+import json
+from typing import AsyncGenerator, Dict, List, Optional, Sequence
+from urllib.parse import urlsplit, urlunsplit
+
 import httpx
-from pydantic import HttpUrl
+from pydantic import HttpUrl, ValidationError
 
+from src.commonlib.async_http_client import get_http_client
 from src.commonlib.config import settings
 from src.commonlib.logger import search_logger
-from src.commonlib.types import Crawl4AIResponse
+from src.commonlib.types import Crawl4AIResponse, Crawl4AIResponseResult
+
+
+def _url_key(url: str) -> str:
+    """
+    Loose url key used to match crawl4ai results back to the requested urls
+    (crawl4ai may add/remove the trailing slash or change the host casing),
+    path and query stay case-sensitive
+    """
+    parts = urlsplit(url.strip())
+    return urlunsplit(
+        (
+            parts.scheme.lower(),
+            parts.netloc.lower(),
+            parts.path.rstrip("/"),
+            parts.query,
+            parts.fragment,
+        )
+    )
 
 
 class AsyncCrawl4AIClient:
-    def __init__(self, timeout: float = 100):
+    def __init__(self, timeout: float = settings.CRAWL4AI_TIMEOUT):
         self._base_url = settings.CRAWL4AI_HOST
+        self._stream_url = f"{settings.CRAWL4AI_HOST}/stream"
         self._timeout = timeout
 
-    async def scrape(self, url: HttpUrl) -> Crawl4AIResponse:
+    @staticmethod
+    def _payload(urls: Sequence[str], stream: bool = False) -> Dict:
+        return {
+            "urls": list(urls),
+            "crawler_config": {
+                "type": "CrawlerRunConfig",
+                "params": {
+                    "stream": stream,
+                },
+            },
+        }
+
+    @staticmethod
+    def match_url(
+        requested: Sequence[str], result: Crawl4AIResponseResult
+    ) -> Optional[str]:
+        """
+        Map a crawl4ai result back to the url it was requested with
+
+        Args:
+            requested (Sequence[str]): requested urls
+            result (Crawl4AIResponseResult): crawl4ai result
+        Returns:
+            Optional[str]: matching requested url
+        """
+        keys = {_url_key(url): url for url in requested}
+        url = keys.get(_url_key(result.url))
+        if url is None and result.redirected_url:
+            url = keys.get(_url_key(result.redirected_url))
+        return url
+
+    async def _crawl(self, urls: Sequence[str]) -> Crawl4AIResponse:
         """
         request to crawl4ai server
 
         Args:
-            url (HttpUrl): website url to scrape
+            urls (Sequence[str]): website urls to scrape in one crawl4ai request
         Returns:
             Crawl4AIResponse: response from crawl4ai server
         Raises:
-            asyncio.TimeoutError: if the request times out
-            aiohttp.ClientError: if the request fails
+            httpx.TimeoutException: if the request times out
+            httpx.HTTPError: if the request fails
         """
-        payload = {
-            "urls": [str(url)],
-            "crawler_config": {
-                "type": "CrawlerRunConfig",
-                "params": {
-                    "stream": False,
-                },
-            },
-        }
         try:
-            async with httpx.AsyncClient(timeout=self._timeout) as client:
-                response = await client.post(self._base_url, json=payload)
-                response.raise_for_status()
-                return Crawl4AIResponse(**response.json())
+            client = get_http_client()
+            response = await client.post(
+                self._base_url, json=self._payload(urls), timeout=self._timeout
+            )
+            response.raise_for_status()
+            return Crawl4AIResponse(**response.json())
         except httpx.ConnectError as ce:
             search_logger.error(
                 f"Failed to connect to Crawl4AI server at {self._base_url}: {ce}"
             )
             raise ce
         except httpx.TimeoutException as te:
-            search_logger.error(f"Request to {url} timed out after {self._timeout}s")
+            search_logger.error(f"Request to {urls} timed out after {self._timeout}s")
             raise te
         except httpx.HTTPStatusError as he:
             search_logger.error(f"crawl4ai scraping error: {str(he)}")
@@ -56,3 +105,137 @@ class AsyncCrawl4AIClient:
                 f"crawl4ai scraping error {type(e).__name__ }, {str(e)}"
             )
             raise e
+
+    async def scrape(self, url: HttpUrl) -> Crawl4AIResponse:
+        """
+        request to crawl4ai server
+
+        Args:
+            url (HttpUrl): website url to scrape
+        Returns:
+            Crawl4AIResponse: response from crawl4ai server
+        Raises:
+            httpx.TimeoutException: if the request times out
+            httpx.HTTPError: if the request fails
+        """
+        return await self._crawl([str(url)])
+
+    async def scrape_many(
+        self, urls: Sequence[HttpUrl]
+    ) -> Dict[str, Optional[Crawl4AIResponseResult]]:
+        """
+        Scrape several urls with as few crawl4ai requests as possible.
+
+        urls are sent in chunks of CRAWL4AI_BATCH_SIZE (one request per chunk,
+        chunks run concurrently) so the crawler can share one browser context
+        across the batch. A failed chunk does not fail the others.
+
+        Args:
+            urls (Sequence[HttpUrl]): website urls to scrape
+        Returns:
+            Dict[str, Optional[Crawl4AIResponseResult]]: result per requested url
+                (None when the url could not be scraped)
+        """
+        requested: List[str] = list(dict.fromkeys(str(url) for url in urls))
+        scraped: Dict[str, Optional[Crawl4AIResponseResult]] = {
+            url: None for url in requested
+        }
+        if not requested:
+            return scraped
+
+        batch_size = max(1, settings.CRAWL4AI_BATCH_SIZE)
+        chunks = [
+            requested[i : i + batch_size] for i in range(0, len(requested), batch_size)
+        ]
+        responses = await asyncio.gather(
+            *(self._crawl(chunk) for chunk in chunks), return_exceptions=True
+        )
+
+        for chunk, response in zip(chunks, responses):
+            if isinstance(response, BaseException):
+                search_logger.warning(
+                    f"crawl4ai batch of {len(chunk)} urls failed: {str(response)}"
+                )
+                continue
+
+            for result in response.results:
+                url = self.match_url(requested, result)
+                if url is None:
+                    search_logger.warning(
+                        f"crawl4ai returned a result for an unknown url={result.url}"
+                    )
+                    continue
+                scraped[url] = result
+
+        return scraped
+
+    async def scrape_stream(
+        self, urls: Sequence[HttpUrl]
+    ) -> AsyncGenerator[Crawl4AIResponseResult, None]:
+        """
+        Scrape several urls with crawl4ai streaming mode, yielding every
+        result as soon as its page finishes (NDJSON, one result per line).
+
+        Closing the generator early closes the underlying response, so callers
+        can stop consuming once they have gathered enough content.
+
+        Args:
+            urls (Sequence[HttpUrl]): website urls to scrape
+        Yields:
+            Crawl4AIResponseResult: result of a finished page
+        Raises:
+            httpx.TimeoutException: if the request times out
+            httpx.HTTPError: if the request fails
+        """
+        requested: List[str] = list(dict.fromkeys(str(url) for url in urls))
+        if not requested:
+            return
+
+        try:
+            client = get_http_client()
+            async with client.stream(
+                "POST",
+                self._stream_url,
+                json=self._payload(requested, stream=True),
+                timeout=self._timeout,
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+
+                    try:
+                        data = json.loads(line)
+                    except ValueError as ve:
+                        # a truncated line must not lose the pages already streamed
+                        search_logger.warning(
+                            f"invalid crawl4ai stream line: {str(ve)}: {line[:200]}"
+                        )
+                        continue
+                    if not isinstance(data, dict):
+                        continue
+                    if data.get("status") == "completed":
+                        break
+
+                    try:
+                        yield Crawl4AIResponseResult(**data)
+                    except ValidationError as ve:
+                        search_logger.warning(
+                            f"invalid crawl4ai stream result for url={data.get('url')}: {str(ve)}"
+                        )
+        except httpx.ConnectError as ce:
+            search_logger.error(
+                f"Failed to connect to Crawl4AI server at {self._stream_url}: {ce}"
+            )
+            raise ce
+        except httpx.TimeoutException as te:
+            search_logger.error(
+                f"Request to {requested} timed out after {self._timeout}s"
+            )
+            raise te
+        except httpx.HTTPStatusError as he:
+            search_logger.error(f"crawl4ai scraping error: {str(he)}")
+            raise he
+        except httpx.RequestError as re:
+            search_logger.error(f"Unexpected client error: {str(re)}")
+            raise re
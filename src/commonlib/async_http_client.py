@@ -0,0 +1,120 @@
+"""
+Shared connection-pooled HTTP client for outbound calls (serper, crawl4ai).
+"""
+
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, Dict
+from urllib.parse import urlsplit
+
+import httpx
+
+from src.commonlib import infra_state
+from src.commonlib.config import settings
+from src.commonlib.logger import search_logger
+
+
+def _is_http2_available() -> bool:
+    """
+    httpx only speaks HTTP/2 when the optional `h2` package is installed
+
+    Returns:
+        bool
+    """
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _host_pattern(url: str) -> str:
+    """
+    Build an httpx mount pattern (scheme://host[:port]) for a url
+
+    Args:
+        url (str): any url on the host
+    Returns:
+        str
+    """
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _limits(max_connections: int, max_keepalive_connections: int) -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=settings.HTTP_CLIENT_KEEPALIVE_EXPIRY,
+    )
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Create the app-lifetime HTTP client.
+
+    Serper and crawl4ai each get a dedicated transport (mounted on their host)
+    so that keep-alive connections are pooled and bounded per host, every
+    other host falls back to the default transport.
+
+    Returns:
+        httpx.AsyncClient
+    """
+    http2 = settings.HTTP_CLIENT_HTTP2 and _is_http2_available()
+    if settings.HTTP_CLIENT_HTTP2 and not http2:
+        search_logger.warning(
+            "HTTP/2 requested but the `h2` package is not installed, falling back to HTTP/1.1"
+        )
+
+    mounts: Dict[str, httpx.AsyncBaseTransport] = {
+        _host_pattern(settings.SERPER_API_URL): httpx.AsyncHTTPTransport(
+            http2=http2,
+            limits=_limits(
+                settings.SERPER_MAX_CONNECTIONS,
+                settings.SERPER_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+        ),
+        _host_pattern(settings.CRAWL4AI_HOST): httpx.AsyncHTTPTransport(
+            http2=http2,
+            limits=_limits(
+                settings.CRAWL4AI_MAX_CONNECTIONS,
+                settings.CRAWL4AI_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+        ),
+    }
+
+    return httpx.AsyncClient(
+        http2=http2,
+        timeout=httpx.Timeout(
+            settings.HTTP_CLIENT_TIMEOUT,
+            connect=settings.HTTP_CLIENT_CONNECT_TIMEOUT,
+        ),
+        limits=_limits(
+            settings.HTTP_CLIENT_MAX_CONNECTIONS,
+            settings.HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS,
+        ),
+        mounts=mounts,
+    )
+
+
+@asynccontextmanager
+async def http_client_lifespan() -> AsyncGenerator[httpx.AsyncClient, None]:
+    """
+    Lifespan context that creates ONE pooled httpx.AsyncClient
+    for the entire app lifetime.
+    """
+    async with create_http_client() as client:
+        yield client
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Get the shared HTTP client created by the app lifespan
+
+    Returns:
+        httpx.AsyncClient
+    Raises:
+        RuntimeError: if the app lifespan has not initialized the client
+    """
+    if infra_state.http_client is None:
+        raise RuntimeError("HTTP client is not initialized")
+    return infra_state.http_client
@@ -0,0 +1,150 @@
+import asyncio
+import re
+from typing import Dict, Optional, Tuple
+
+from src.commonlib.async_http_client import get_http_client
+from src.commonlib.config import settings
+from src.commonlib.logger import search_logger
+from src.commonlib.lru_cache import LRUCache
+
+# cache ttl per serper/google `tbs=qdr:<unit>[<count>]` date range unit,
+# the narrower the freshness window the sooner results go stale
+_DATE_RANGE_TTL_SECONDS: Dict[str, int] = {
+    "h": 5 * 60,  # past hour: minutes
+    "d": 30 * 60,  # past day
+    "w": 3 * 60 * 60,  # past week: hours
+    "m": 12 * 60 * 60,  # past month
+    "y": 24 * 60 * 60,  # past year
+}
+_DATE_RANGE_PATTERN = re.compile(r"qdr:([hdwmy])(\d*)")
+
+SerperCacheKey = Tuple[str, str, str, str]
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a search query (casing and whitespace) for cache lookups
+
+    Args:
+        query (str): search query
+    Returns:
+        str
+    """
+    return " ".join(query.lower().split())
+
+
+def freshness_ttl(tbs: Optional[str]) -> int:
+    """
+    Cache ttl for a serper date range
+
+    Args:
+        tbs (Optional[str]): date range, e.g. `qdr:h`, `qdr:w`, `qdr:m6`
+    Returns:
+        int: ttl in seconds
+    """
+    if settings.SERPER_CACHE_TTL_SECONDS is not None:
+        return settings.SERPER_CACHE_TTL_SECONDS
+
+    match = _DATE_RANGE_PATTERN.fullmatch((tbs or "").strip())
+    if match is None:
+        # no date range, results only drift slowly
+        return _DATE_RANGE_TTL_SECONDS["y"]
+
+    unit, count = match.groups()
+    return _DATE_RANGE_TTL_SECONDS[unit] * max(1, int(count or 1))
+
+
+class AsyncSerperClient:
+    """
+    Serper search client with a result cache.
+
+    Results are cached per normalized query + gl/hl/tbs for a ttl derived from
+    the date range, and concurrent identical queries share one in-flight request.
+    """
+
+    def __init__(self, timeout: float = settings.SERPER_TIMEOUT):
+        self._base_url = settings.SERPER_API_URL
+        self._timeout = timeout
+        self._cache: LRUCache[Dict] = LRUCache(
+            max_entries=settings.SERPER_CACHE_MAX_ENTRIES
+        )
+        self._in_flight: Dict[SerperCacheKey, asyncio.Future] = {}
+
+    async def _search(self, key: SerperCacheKey, payload: Dict) -> Dict:
+        """
+        request to serper api, caches the response on success
+
+        Args:
+            key (SerperCacheKey): cache key
+            payload (Dict): serper request body
+        Returns:
+            Dict: serper response
+        Raises:
+            httpx.TimeoutException: if the request times out
+            httpx.HTTPError: if the request fails
+        """
+        headers = {
+            "X-API-KEY": settings.SERPER_API_KEY,
+            "Content-Type": "application/json",
+        }
+        client = get_http_client()
+        response = await client.post(
+            self._base_url, headers=headers, json=payload, timeout=self._timeout
+        )
+        search_logger.info(
+            f"fetch web sources from internet with status_code: {response.status_code}"
+        )
+        response.raise_for_status()
+        data = response.json()
+
+        if settings.SERPER_CACHE_ENABLED and isinstance(data, Dict):
+            self._cache.set(key, data, ttl=freshness_ttl(payload.get("tbs")))
+        return data
+
+    def _on_search_done(self, key: SerperCacheKey, future: asyncio.Future) -> None:
+        self._in_flight.pop(key, None)
+        # mark the exception as retrieved even when every caller was cancelled
+        if not future.cancelled():
+            future.exception()
+
+    async def search(
+        self,
+        query: str,
+        gl: str = settings.SERPER_DEFAULT_COUNTRY,
+        hl: str = settings.SERPER_DEFAULT_LANGUAGE,
+        tbs: str = settings.SERPER_DEFAULT_DATE_RANGE,
+    ) -> Dict:
+        """
+        Search the web with serper
+
+        Args:
+            query (str): search query
+            gl (str): country
+            hl (str): language
+            tbs (str): date range
+        Returns:
+            Dict: serper response
+        Raises:
+            httpx.TimeoutException: if the request times out
+            httpx.HTTPError: if the request fails
+        """
+        key: SerperCacheKey = (normalize_query(query), gl, hl, tbs)
+        if settings.SERPER_CACHE_ENABLED:
+            data = self._cache.get(key)
+            if data is not None:
+                search_logger.info(f"serper cache hit for query={query}")
+                return data
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is None:
+            payload = {"q": query, "gl": gl, "hl": hl, "tbs": tbs}
+            in_flight = asyncio.ensure_future(self._search(key, payload))
+            self._in_flight[key] = in_flight
+            in_flight.add_done_callback(
+                lambda future: self._on_search_done(key, future)
+            )
+        else:
+            search_logger.info(f"joining in-flight serper request for query={query}")
+
+        # shield: a cancelled caller must not cancel the request other callers wait on
+        return await asyncio.shield(in_flight)
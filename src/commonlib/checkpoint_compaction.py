@@ -0,0 +1,256 @@
+"""
+Compaction of the LangGraph checkpoint tables.
+
+Every super-step of every thread leaves a checkpoint (plus its channel blobs
+and pending writes) behind. The job keeps the last N checkpoints of every
+idle thread, drops the writes and blobs no remaining checkpoint references
+and expires the checkpoints of threads idle beyond a TTL.
+"""
+
+import asyncio
+import datetime
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, List, Optional
+
+from psycopg import AsyncConnection
+from psycopg_pool.pool_async import AsyncConnectionPool
+
+from src.commonlib import types as common_types
+from src.commonlib.config import settings
+from src.commonlib.logger import search_logger
+
+# pg_try_advisory_lock key, one compaction at a time across app workers
+COMPACTION_LOCK_KEY = 0x636B70745F636D70
+
+# a thread is idle when its latest checkpoint is older than the given timestamp
+# (`ts` is an ISO-8601 UTC timestamp, comparable as text)
+SELECT_COMPACTABLE_THREADS_SQL = """
+SELECT thread_id
+FROM checkpoints
+WHERE thread_id > %(after)s
+GROUP BY thread_id
+HAVING count(*) > %(keep_last)s AND max(checkpoint ->> 'ts') < %(idle_before)s
+ORDER BY thread_id
+LIMIT %(batch_size)s
+"""
+
+DELETE_OLD_CHECKPOINTS_SQL = """
+DELETE FROM checkpoints c
+USING (
+    SELECT thread_id, checkpoint_ns, checkpoint_id,
+           row_number() OVER (
+               PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC
+           ) AS position
+    FROM checkpoints
+    WHERE thread_id = ANY(%(thread_ids)s)
+) ranked
+WHERE c.thread_id = ranked.thread_id
+  AND c.checkpoint_ns = ranked.checkpoint_ns
+  AND c.checkpoint_id = ranked.checkpoint_id
+  AND ranked.position > %(keep_last)s
+"""
+
+DELETE_ORPHAN_WRITES_SQL = """
+DELETE FROM checkpoint_writes w
+WHERE w.thread_id = ANY(%(thread_ids)s)
+  AND NOT EXISTS (
+      SELECT 1 FROM checkpoints c
+      WHERE c.thread_id = w.thread_id
+        AND c.checkpoint_ns = w.checkpoint_ns
+        AND c.checkpoint_id = w.checkpoint_id
+  )
+"""
+
+DELETE_ORPHAN_BLOBS_SQL = """
+DELETE FROM checkpoint_blobs b
+WHERE b.thread_id = ANY(%(thread_ids)s)
+  AND NOT EXISTS (
+      SELECT 1 FROM checkpoints c
+      WHERE c.thread_id = b.thread_id
+        AND c.checkpoint_ns = b.checkpoint_ns
+        AND c.checkpoint -> 'channel_versions' ->> b.channel = b.version
+  )
+"""
+
+SELECT_EXPIRED_THREADS_SQL = """
+SELECT thread_id
+FROM checkpoints
+GROUP BY thread_id
+HAVING max(checkpoint ->> 'ts') < %(expire_before)s
+LIMIT %(batch_size)s
+"""
+
+DELETE_THREADS_SQL = [
+    "DELETE FROM checkpoint_writes WHERE thread_id = ANY(%(thread_ids)s)",
+    "DELETE FROM checkpoint_blobs WHERE thread_id = ANY(%(thread_ids)s)",
+    "DELETE FROM checkpoints WHERE thread_id = ANY(%(thread_ids)s)",
+]
+
+
+def _timestamp_before(seconds: float) -> str:
+    moment = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(
+        seconds=seconds
+    )
+    return moment.isoformat()
+
+
+async def _fetch_thread_ids(
+    conn: AsyncConnection, query: str, params: dict
+) -> List[str]:
+    cursor = await conn.execute(query, params)
+    return [row["thread_id"] for row in await cursor.fetchall()]
+
+
+async def _execute_rowcount(conn: AsyncConnection, query: str, params: dict) -> int:
+    cursor = await conn.execute(query, params)
+    return max(cursor.rowcount, 0)
+
+
+async def compact_checkpoints(
+    conn: AsyncConnection,
+    keep_last: int = settings.CHECKPOINT_KEEP_LAST,
+    ttl_seconds: Optional[float] = settings.CHECKPOINT_THREAD_TTL_SECONDS,
+    min_idle_seconds: float = settings.CHECKPOINT_COMPACTION_MIN_IDLE_SECONDS,
+    batch_size: int = settings.CHECKPOINT_COMPACTION_BATCH_SIZE,
+) -> common_types.CheckpointCompactionReport:
+    """
+    Compact the checkpoint tables, one transaction per batch of threads.
+
+    Threads with a checkpoint in the last `min_idle_seconds` are left alone, a
+    running agent writes blobs before the checkpoint that references them.
+
+    Args:
+        conn (AsyncConnection): autocommit connection with a dict row factory
+            and the checkpoint schema on its search_path
+        keep_last (int): checkpoints kept per thread and namespace (at least 1)
+        ttl_seconds (Optional[float]): expire threads idle for longer (None = never)
+        min_idle_seconds (float): only compact threads idle for at least this long
+        batch_size (int): threads per transaction
+    Returns:
+        common_types.CheckpointCompactionReport
+    """
+    keep_last = max(keep_last, 1)
+    report = common_types.CheckpointCompactionReport()
+
+    if ttl_seconds:
+        expire_before = _timestamp_before(ttl_seconds)
+        while True:
+            async with conn.transaction():
+                thread_ids = await _fetch_thread_ids(
+                    conn,
+                    SELECT_EXPIRED_THREADS_SQL,
+                    {"expire_before": expire_before, "batch_size": batch_size},
+                )
+                if not thread_ids:
+                    break
+                for query in DELETE_THREADS_SQL:
+                    await conn.execute(query, {"thread_ids": thread_ids})
+            report.threads_expired += len(thread_ids)
+
+    idle_before = _timestamp_before(min_idle_seconds)
+    after = ""
+    while True:
+        async with conn.transaction():
+            thread_ids = await _fetch_thread_ids(
+                conn,
+                SELECT_COMPACTABLE_THREADS_SQL,
+                {
+                    "after": after,
+                    "keep_last": keep_last,
+                    "idle_before": idle_before,
+                    "batch_size": batch_size,
+                },
+            )
+            if not thread_ids:
+                break
+
+            params = {"thread_ids": thread_ids, "keep_last": keep_last}
+            report.checkpoints_deleted += await _execute_rowcount(
+                conn, DELETE_OLD_CHECKPOINTS_SQL, params
+            )
+            report.writes_deleted += await _execute_rowcount(
+                conn, DELETE_ORPHAN_WRITES_SQL, params
+            )
+            report.blobs_deleted += await _execute_rowcount(
+                conn, DELETE_ORPHAN_BLOBS_SQL, params
+            )
+        report.threads_compacted += len(thread_ids)
+        after = thread_ids[-1]
+
+    search_logger.info(f"Checkpoint compaction: {report.model_dump()}")
+    return report
+
+
+async def compact_checkpoints_once(
+    pool: AsyncConnectionPool,
+) -> Optional[common_types.CheckpointCompactionReport]:
+    """
+    Compact the checkpoint tables unless another worker is already doing it
+
+    Args:
+        pool (AsyncConnectionPool): checkpointer connection pool
+    Returns:
+        Optional[common_types.CheckpointCompactionReport]: None when skipped
+    """
+    async with pool.connection() as conn:
+        cursor = await conn.execute(
+            "SELECT pg_try_advisory_lock(%s) AS locked", (COMPACTION_LOCK_KEY,)
+        )
+        if not (await cursor.fetchone())["locked"]:
+            search_logger.info(
+                "Checkpoint compaction already running on another worker"
+            )
+            return None
+        try:
+            return await compact_checkpoints(conn)
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock(%s)", (COMPACTION_LOCK_KEY,))
+
+
+async def compaction_worker(
+    pool: AsyncConnectionPool,
+    interval_seconds: float = settings.CHECKPOINT_COMPACTION_INTERVAL_SECONDS,
+) -> None:
+    """
+    Compact the checkpoint tables every `interval_seconds`
+
+    Args:
+        pool (AsyncConnectionPool): checkpointer connection pool
+        interval_seconds (float): pause between two runs
+    """
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await compact_checkpoints_once(pool)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            search_logger.error(
+                f"Checkpoint compaction failed: {str(e)}",
+                exc_info=True,
+            )
+
+
+@asynccontextmanager
+async def checkpoint_compaction_lifespan(
+    pool: AsyncConnectionPool,
+) -> AsyncGenerator[Optional[asyncio.Task], None]:
+    """
+    Run the compaction worker for the app lifetime (if enabled)
+
+    Args:
+        pool (AsyncConnectionPool): checkpointer connection pool
+    """
+    if not settings.CHECKPOINT_COMPACTION_ENABLED:
+        yield None
+        return
+
+    task = asyncio.create_task(compaction_worker(pool))
+    try:
+        yield task
+    finally:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
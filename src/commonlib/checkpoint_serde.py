@@ -0,0 +1,82 @@
+"""
+Checkpoint serializer that compresses large payloads with zstandard before
+they are encrypted (encrypted bytes do not compress anymore).
+"""
+
+import threading
+from typing import Any, Tuple
+
+import zstandard
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.encrypted import EncryptedSerializer
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from src.commonlib.config import settings
+
+# appended to the inner type, e.g. `msgpack:zstd` (stored as `msgpack:zstd+aes`),
+# must not contain "+" which separates the cipher name
+ZSTD_TYPE_SUFFIX = ":zstd"
+
+
+class ZstdSerializer(SerializerProtocol):
+    """
+    Compress the output of another serializer with zstandard once it reaches
+    `min_bytes`. Payloads without the type suffix (small or written before
+    compression was enabled) are read as is.
+    """
+
+    def __init__(
+        self,
+        serde: SerializerProtocol = JsonPlusSerializer(),
+        min_bytes: int = settings.CHECKPOINT_COMPRESSION_MIN_BYTES,
+        level: int = settings.CHECKPOINT_COMPRESSION_LEVEL,
+    ):
+        self.serde = serde
+        self._min_bytes = min_bytes
+        self._level = level
+        # zstandard (de)compressors must not be shared between threads
+        self._local = threading.local()
+
+    def _compressor(self) -> zstandard.ZstdCompressor:
+        compressor = getattr(self._local, "compressor", None)
+        if compressor is None:
+            compressor = self._local.compressor = zstandard.ZstdCompressor(
+                level=self._level
+            )
+        return compressor
+
+    def _decompressor(self) -> zstandard.ZstdDecompressor:
+        decompressor = getattr(self._local, "decompressor", None)
+        if decompressor is None:
+            decompressor = self._local.decompressor = zstandard.ZstdDecompressor()
+        return decompressor
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        typ, data = self.serde.dumps_typed(obj)
+        if len(data) < self._min_bytes:
+            return typ, data
+
+        compressed = self._compressor().compress(data)
+        if len(compressed) >= len(data):
+            return typ, data
+        return f"{typ}{ZSTD_TYPE_SUFFIX}", compressed
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        typ, payload = data
+        if typ.endswith(ZSTD_TYPE_SUFFIX):
+            typ = typ[: -len(ZSTD_TYPE_SUFFIX)]
+            payload = self._decompressor().decompress(payload)
+        return self.serde.loads_typed((typ, payload))
+
+
+def create_serde() -> EncryptedSerializer:
+    """
+    AES encrypted checkpoint serializer, compressing before encryption when
+    CHECKPOINT_COMPRESSION_ENABLED
+
+    Returns:
+        EncryptedSerializer
+    """
+    if not settings.CHECKPOINT_COMPRESSION_ENABLED:
+        return EncryptedSerializer.from_pycryptodome_aes()
+    return EncryptedSerializer.from_pycryptodome_aes(serde=ZstdSerializer())
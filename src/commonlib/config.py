@@ -1,4 +1,5 @@
 import logging
+from typing import Optional
 from urllib.parse import quote, quote_plus, urljoin
 
 from pydantic import computed_field, field_validator, model_validator
@@ -28,6 +29,16 @@ class Settings(BaseSettings):
     SUMMERIZATION_MIDDLEWARE_LIMIT: float = 0.7
     # Data staging limits
     MAX_DOCUMENTS_STAGING_LIMIT: int = 5
+    TOOL_OUTPUT_MAX_TOKENS: int = 6000
+    TOOL_OUTPUT_TOKEN_ENCODING: str = "o200k_base"
+    # BM25 passage reranking of scraped pages
+    RERANK_ENABLED: bool = True
+    RERANK_TOP_K: int = 12
+    RERANK_PASSAGE_MAX_CHARS: int = 1500
+    # SimHash near-duplicate elimination of scraped pages/paragraphs
+    DEDUP_ENABLED: bool = True
+    DEDUP_MAX_HAMMING_DISTANCE: int = 3
+    DEDUP_MIN_PARAGRAPH_WORDS: int = 8
 
     # database
     DATABASE_USERNAME: str
@@ -35,6 +46,20 @@ class Settings(BaseSettings):
     DATABASE_NAME: str
     DATABASE_HOST: str
     DATABASE_PORT: int = 5432
+    # sqlalchemy (asyncpg) engine pool of the api
+    DATABASE_POOL_SIZE: int = 10
+    DATABASE_POOL_MAX_OVERFLOW: int = 10
+    # seconds to wait for a free connection before failing the request
+    DATABASE_POOL_TIMEOUT: float = 10.0
+    # connections older than this are replaced on checkout (-1 = never)
+    DATABASE_POOL_RECYCLE: int = 1800
+    DATABASE_POOL_PRE_PING: bool = True
+    # prepared statements cached per connection (0 behind pgbouncer transaction mode)
+    DATABASE_STATEMENT_CACHE_SIZE: int = 100
+    # LISTEN/NOTIFY bus between app workers (e.g. stream cancellation)
+    PG_NOTIFY_CONNECT_TIMEOUT: float = 5.0
+    # wait for the worker running a stream to acknowledge its cancellation
+    STREAM_CANCEL_ACK_TIMEOUT_SECONDS: float = 2.0
 
     # serper
     SERPER_API_KEY: str
@@ -43,12 +68,83 @@ class Settings(BaseSettings):
     SERPER_DEFAULT_LANGUAGE: str = "en"  # english
     SERPER_DEFAULT_DATE_RANGE: str = "qdr:w"  # past week
     SERPER_API_RESULTS_MAX_LIMIT: int = 5
+    SERPER_TIMEOUT: float = 8.0
+    SERPER_MAX_CONNECTIONS: int = 20
+    SERPER_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    SERPER_CACHE_ENABLED: bool = True
+    SERPER_CACHE_MAX_ENTRIES: int = 1024
+    # overrides the ttl derived from the date range (e.g. minutes for qdr:h)
+    SERPER_CACHE_TTL_SECONDS: Optional[int] = None
 
     # crawl4ai
     CRAWL4AI_HOST: str
+    CRAWL4AI_TIMEOUT: float = 100.0
+    CRAWL4AI_BATCH_SIZE: int = 10
+    CRAWL4AI_STREAM_ENABLED: bool = True
+    # opt-in: stop scraping once enough pages / bytes of markdown are gathered
+    # (0 = no limit, every staged page is scraped)
+    CRAWL4AI_STREAM_ENOUGH_PAGES: int = 0
+    CRAWL4AI_STREAM_ENOUGH_BYTES: int = 0
+    CRAWL4AI_MAX_CONNECTIONS: int = 20
+    CRAWL4AI_MAX_KEEPALIVE_CONNECTIONS: int = 10
+
+    # scraped page cache
+    PAGE_CACHE_ENABLED: bool = True
+    PAGE_CACHE_TTL_SECONDS: int = 24 * 60 * 60
+    PAGE_CACHE_LRU_MAX_ENTRIES: int = 256
+    PAGE_CACHE_REVALIDATE_TIMEOUT: float = 3.0
+
+    # shared http client
+    HTTP_CLIENT_HTTP2: bool = True
+    HTTP_CLIENT_TIMEOUT: float = 30.0
+    HTTP_CLIENT_CONNECT_TIMEOUT: float = 5.0
+    HTTP_CLIENT_MAX_CONNECTIONS: int = 100
+    HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_CLIENT_KEEPALIVE_EXPIRY: float = 30.0
+
+    # cached /thread/list pages (invalidated by thread and message writes)
+    THREAD_LIST_CACHE_ENABLED: bool = True
+    THREAD_LIST_CACHE_MAX_ENTRIES: int = 512
+    # upper bound of staleness if an invalidation from another worker is lost
+    THREAD_LIST_CACHE_TTL_SECONDS: float = 60.0
+    # broadcast invalidations to the other workers (postgres NOTIFY)
+    THREAD_LIST_CACHE_SHARED: bool = True
+
+    # chat stream sessions (resume with Last-Event-ID)
+    STREAM_REPLAY_BUFFER_SIZE: int = 10_000
+    # agent keeps running this long after the last client disconnected
+    STREAM_RESUME_GRACE_SECONDS: float = 60.0
+    # detached generations: concurrent agents and waiting requests
+    DETACHED_MAX_WORKERS: int = 4
+    DETACHED_MAX_QUEUED: int = 16
+    # write-behind of partial answers while streaming (one UPDATE per tick)
+    MESSAGE_PERSIST_ENABLED: bool = True
+    MESSAGE_PERSIST_INTERVAL_SECONDS: float = 2.0
+    # flush before the tick once a stream has this much unsaved output
+    MESSAGE_PERSIST_FLUSH_BYTES: int = 16_384
 
     # langgraph postgres checkpointer
     LANGGRAPH_AES_KEY: str
+    CHECKPOINTER_POOL_MIN_SIZE: int = 2
+    CHECKPOINTER_POOL_MAX_SIZE: int = 10
+    # seconds to wait for a free connection before failing the request
+    CHECKPOINTER_POOL_TIMEOUT: float = 30.0
+    # idle connections above min size are closed after this many seconds
+    CHECKPOINTER_POOL_MAX_IDLE: float = 300.0
+    CHECKPOINTER_POOL_MAX_LIFETIME: float = 3600.0
+    # checkpoint compaction (keep the last N per thread, expire idle threads)
+    CHECKPOINT_COMPACTION_ENABLED: bool = True
+    CHECKPOINT_COMPACTION_INTERVAL_SECONDS: float = 60 * 60
+    CHECKPOINT_KEEP_LAST: int = 20
+    # opt-in: checkpoints of threads idle for longer are deleted (None = keep forever)
+    CHECKPOINT_THREAD_TTL_SECONDS: Optional[float] = None
+    # threads with a newer checkpoint are skipped (agent may still be writing)
+    CHECKPOINT_COMPACTION_MIN_IDLE_SECONDS: float = 10 * 60
+    CHECKPOINT_COMPACTION_BATCH_SIZE: int = 500
+    # zstd compression of checkpoint payloads before encryption
+    CHECKPOINT_COMPRESSION_ENABLED: bool = True
+    CHECKPOINT_COMPRESSION_MIN_BYTES: int = 1024
+    CHECKPOINT_COMPRESSION_LEVEL: int = 3
 
     @computed_field
     def db_url(self) -> str:
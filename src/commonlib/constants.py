@@ -1,8 +1,16 @@
 # api error messages
 API_ERROR_MESSAGE: str = "Something went wrong, please try again later"
 THREAD_NOT_FOUND_ERROR: str = "Thread not found"
+MESSAGE_NOT_FOUND_ERROR: str = "Message not found"
 THREAD_DELETED_ERROR: str = "Thread deleted successfully"
 SEARCH_JOB_CANCEL_ERROR: str = "Search job cancelled successfully"
+SEARCH_JOB_CANCEL_REQUESTED: str = "Search job cancellation requested"
+STREAM_NOT_FOUND_ERROR: str = "Stream not found or already expired"
+DETACHED_POOL_FULL_ERROR: str = "Too many background answers in progress, please retry"
+INVALID_CURSOR_ERROR: str = "Invalid pagination cursor"
+STREAM_REPLAY_EXPIRED_ERROR: str = (
+    "Stream can no longer be resumed from this event, reload the message"
+)
 
 # llm error messages
 LLM_RESPONSE_STREAMING_ERROR: str = (
@@ -2,7 +2,11 @@
 
 from typing import Any, Optional
 
+import httpx
 from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
 
 checkpointer: Optional[AsyncPostgresSaver] = None
 stream_manager: Optional[Any] = None
+http_client: Optional[httpx.AsyncClient] = None
+notify_bus: Optional[Any] = None
+message_persister: Optional[Any] = None
@@ -4,24 +4,52 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
+from src.commonlib.async_http_client import http_client_lifespan
+from src.commonlib.checkpoint_compaction import checkpoint_compaction_lifespan
 from src.commonlib.logger import search_logger
+from src.commonlib.pg_notify import notify_bus_lifespan
 from src.commonlib.postgres_checkpointer import checkpointer_lifespan
-from src.search.agents.stream_manager import StreamManager
+from src.search.agents.message_persister import message_persister_lifespan
+from src.search.agents.stream_manager import (
+    STREAM_CANCEL_ACK_CHANNEL,
+    STREAM_CANCEL_CHANNEL,
+    StreamManager,
+)
+from src.search.thread_list_cache import THREAD_LIST_CHANNEL, thread_list_cache
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    async with checkpointer_lifespan() as checkpointer:
+    stream_manager = StreamManager()
+    async with (
+        http_client_lifespan() as http_client,
+        checkpointer_lifespan() as checkpointer,
+        notify_bus_lifespan(
+            {
+                STREAM_CANCEL_CHANNEL: stream_manager.on_cancel_notification,
+                STREAM_CANCEL_ACK_CHANNEL: stream_manager.on_cancel_ack_notification,
+                THREAD_LIST_CHANNEL: thread_list_cache.on_invalidate_notification,
+            }
+        ) as notify_bus,
+        checkpoint_compaction_lifespan(pool=checkpointer.conn),
+        message_persister_lifespan() as message_persister,
+    ):
 
         from src.commonlib import infra_state as state
 
+        state.http_client = http_client
         state.checkpointer = checkpointer
-        state.stream_manager = StreamManager()
+        state.notify_bus = notify_bus
+        state.stream_manager = stream_manager
+        state.message_persister = message_persister
         search_logger.info("Infrastructure initialized successfully")
 
         yield
 
         # Cleanup
+        state.message_persister = None
         state.stream_manager = None
+        state.notify_bus = None
         state.checkpointer = None
+        state.http_client = None
         search_logger.info("Shutting down application successfully")
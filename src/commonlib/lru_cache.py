@@ -0,0 +1,79 @@
+"""
+In-process LRU cache with optional per-entry TTL.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Generic, Hashable, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+
+class LRUCache(Generic[V]):
+    """
+    Bounded least-recently-used cache.
+
+    Not thread-safe, it is meant to be used from the event loop only
+    (no awaits happen while the cache is mutated).
+    """
+
+    def __init__(self, max_entries: int, ttl: Optional[float] = None):
+        """
+        Args:
+            max_entries (int): maximum number of entries before the least recently used is evicted
+            ttl (Optional[float]): default time-to-live in seconds (None = never expires)
+        """
+        self._max_entries = max(1, max_entries)
+        self._ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[Optional[float], V]]" = (
+            OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key) is not None
+
+    def get(self, key: Hashable) -> Optional[V]:
+        """
+        Get a value and mark it as recently used
+
+        Args:
+            key (Hashable): cache key
+        Returns:
+            Optional[V]: cached value, None when missing or expired
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: V, ttl: Optional[float] = None) -> None:
+        """
+        Set a value, evicting the least recently used entry when full
+
+        Args:
+            key (Hashable): cache key
+            value (V): value to cache
+            ttl (Optional[float]): time-to-live in seconds, defaults to the cache ttl
+        """
+        ttl = ttl if ttl is not None else self._ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
@@ -0,0 +1,147 @@
+"""
+Postgres LISTEN/NOTIFY bus to signal every app worker (cross-process / node).
+"""
+
+import asyncio
+import inspect
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional, Set
+
+import psycopg
+from psycopg import sql
+from sqlalchemy import func, select
+
+from src.commonlib.config import settings
+from src.commonlib.logger import search_logger
+from src.database.connection import engine
+
+NotifyHandler = Callable[[str], Any]
+
+
+class PgNotifyBus:
+    """
+    Deliver NOTIFY payloads of subscribed channels to local handlers.
+
+    One dedicated connection LISTENs to every subscribed channel (reconnecting
+    with a backoff when it drops), publishing goes through the app's SQLAlchemy
+    pool. A worker also receives its own notifications, handlers have to be
+    idempotent. Handlers are plain callables or coroutine functions.
+    """
+
+    def __init__(self, conninfo: str = settings.psycopg_dsn_checkpoint):
+        self._conninfo = conninfo
+        self._handlers: Dict[str, List[NotifyHandler]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._connected = asyncio.Event()
+        # running coroutine handlers (keeps a reference until they finish)
+        self._running: Set[asyncio.Future] = set()
+
+    @property
+    def connected(self) -> bool:
+        """Whether the listener currently receives notifications"""
+        return self._connected.is_set()
+
+    def subscribe(self, channel: str, handler: NotifyHandler) -> None:
+        """
+        Register a handler, subscribe before `start`
+
+        Args:
+            channel (str): notification channel
+            handler (NotifyHandler): called with the payload of every notification
+        """
+        self._handlers.setdefault(channel, []).append(handler)
+
+    async def start(self) -> None:
+        """Start listening, waits for the first connection (bounded)"""
+        self._task = asyncio.create_task(self._listen())
+        try:
+            await asyncio.wait_for(
+                self._connected.wait(), timeout=settings.PG_NOTIFY_CONNECT_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            search_logger.warning(
+                "Postgres notification listener not connected yet, retrying in the background"
+            )
+
+    async def stop(self) -> None:
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def _dispatch(self, channel: str, payload: str) -> None:
+        for handler in self._handlers.get(channel, []):
+            try:
+                result = handler(payload)
+                if inspect.isawaitable(result):
+                    future = asyncio.ensure_future(result)
+                    self._running.add(future)
+                    future.add_done_callback(self._running.discard)
+            except Exception as e:
+                search_logger.error(
+                    f"Notification handler failed for channel={channel}: {str(e)}",
+                    exc_info=True,
+                )
+
+    async def _listen(self) -> None:
+        delay = 1.0
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(
+                    self._conninfo, autocommit=True
+                ) as conn:
+                    for channel in self._handlers:
+                        await conn.execute(
+                            sql.SQL("LISTEN {}").format(sql.Identifier(channel))
+                        )
+                    self._connected.set()
+                    delay = 1.0
+                    search_logger.info(
+                        f"Listening to postgres notifications on {list(self._handlers)}"
+                    )
+                    async for notify in conn.notifies():
+                        self._dispatch(notify.channel, notify.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._connected.clear()
+                search_logger.warning(
+                    f"Postgres notification listener failed, reconnecting in {delay}s: {str(e)}"
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+    async def publish(self, channel: str, payload: str) -> None:
+        """
+        NOTIFY every worker listening to a channel
+
+        Args:
+            channel (str): notification channel
+            payload (str): payload (max 8000 bytes)
+        """
+        async with engine.connect() as conn:
+            await conn.execute(select(func.pg_notify(channel, payload)))
+            await conn.commit()
+
+
+@asynccontextmanager
+async def notify_bus_lifespan(
+    subscriptions: Dict[str, NotifyHandler],
+) -> AsyncGenerator[PgNotifyBus, None]:
+    """
+    Lifespan context of the notification bus
+
+    Args:
+        subscriptions (Dict[str, NotifyHandler]): handler of every channel
+    """
+    bus = PgNotifyBus()
+    for channel, handler in subscriptions.items():
+        bus.subscribe(channel, handler)
+    await bus.start()
+    try:
+        yield bus
+    finally:
+        await bus.stop()
@@ -5,10 +5,9 @@ PostgreSQL checkpointer for LangGraph agent state persistence.
 import sys
 from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Dict, Optional
 
 from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
-from langgraph.checkpoint.serde.encrypted import EncryptedSerializer
 from psycopg.rows import dict_row
 from psycopg_pool.pool_async import AsyncConnectionPool
 
@@ -17,14 +16,16 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from dotenv import load_dotenv
 
+from src.commonlib import infra_state
+from src.commonlib.checkpoint_serde import create_serde
 from src.commonlib.config import settings
 
 # load environment variables from .env file
 load_dotenv()
 
 
-# Create encrypted serializer for secure state storage
-serde = EncryptedSerializer.from_pycryptodome_aes()
+# Create encrypted (zstd compressed) serializer for secure state storage
+serde = create_serde()
 
 
 @asynccontextmanager
@@ -32,18 +33,42 @@ async def checkpointer_lifespan() -> AsyncGenerator[AsyncPostgresSaver, None]:
     """
     Lifespan context that creates ONE AsyncPostgresSaver
     for the entire app lifetime.
+
+    The saver runs over the connection pool (a connection per checkpoint
+    operation) so concurrent agent runs do not queue on a single connection.
     """
     async with AsyncConnectionPool(
         conninfo=settings.psycopg_dsn_checkpoint,
+        min_size=settings.CHECKPOINTER_POOL_MIN_SIZE,
+        max_size=settings.CHECKPOINTER_POOL_MAX_SIZE,
+        timeout=settings.CHECKPOINTER_POOL_TIMEOUT,
+        max_idle=settings.CHECKPOINTER_POOL_MAX_IDLE,
+        max_lifetime=settings.CHECKPOINTER_POOL_MAX_LIFETIME,
+        name="checkpointer",
+        open=False,
         kwargs={
             "autocommit": True,
             "prepare_threshold": 0,
             "row_factory": dict_row,
         },
-    ) as pool, pool.connection() as conn:
+    ) as pool:
 
         checkpointer = AsyncPostgresSaver(
-            conn=conn,
+            conn=pool,
             serde=serde,
         )
         yield checkpointer
+
+
+def checkpointer_pool_stats() -> Optional[Dict[str, int]]:
+    """
+    Current stats of the checkpointer connection pool (psycopg_pool `get_stats`:
+    pool_min, pool_max, pool_size, pool_available, requests_waiting, ...)
+
+    Returns:
+        Optional[Dict[str, int]]: None when the checkpointer is not initialized
+    """
+    checkpointer = infra_state.checkpointer
+    if checkpointer is None or not isinstance(checkpointer.conn, AsyncConnectionPool):
+        return None
+    return checkpointer.conn.get_stats()
@@ -75,6 +75,7 @@ class Crawl4AIMarkdown(BaseModel):
 
 class Crawl4AIResponseResult(BaseModel):
     url: str
+    redirected_url: Optional[str] = None
     html: Optional[str] = None
     fit_html: Optional[str] = None
     success: bool
@@ -83,9 +84,18 @@ class Crawl4AIResponseResult(BaseModel):
     links: Crawl4AILinks
     metadata: Optional[dict] = None
     status_code: int
+    response_headers: Optional[dict] = None
     markdown: Crawl4AIMarkdown
 
 
 class Crawl4AIResponse(BaseModel):
     success: bool
     results: List[Crawl4AIResponseResult]
+
+
+class CheckpointCompactionReport(BaseModel):
+    threads_compacted: int = 0
+    checkpoints_deleted: int = 0
+    writes_deleted: int = 0
+    blobs_deleted: int = 0
+    threads_expired: int = 0
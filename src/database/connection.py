@@ -1,17 +1,107 @@
-from typing import AsyncGenerator
+import threading
+import time
+from typing import AsyncGenerator, Dict
 
+from sqlalchemy import exc
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection
 
 from src.commonlib.config import settings
 
+
+class PoolMetrics:
+    """Checkout counters of the engine pool, kept across pool re-creation"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def started(self) -> float:
+        with self._lock:
+            self.waiting += 1
+        return time.perf_counter()
+
+    def finished(self, started: float, timed_out: bool) -> None:
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.waiting -= 1
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.wait_seconds_total += elapsed
+            self.wait_seconds_max = max(self.wait_seconds_max, elapsed)
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool recording how long checkouts wait (incl. connect and pre-ping)"""
+
+    def connect(self) -> PoolProxiedConnection:
+        started = pool_metrics.started()
+        timed_out = False
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            pool_metrics.finished(started, timed_out)
+
+
 # Create async engine
 engine = create_async_engine(
     settings.async_db_url,
     echo=settings.DEBUG,
     echo_pool=settings.DEBUG,
+    poolclass=InstrumentedQueuePool,
+    pool_size=settings.DATABASE_POOL_SIZE,
+    max_overflow=settings.DATABASE_POOL_MAX_OVERFLOW,
+    pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+    pool_recycle=settings.DATABASE_POOL_RECYCLE,
+    pool_pre_ping=settings.DATABASE_POOL_PRE_PING,
+    connect_args={
+        # sqlalchemy's prepared statement cache per asyncpg connection
+        # (0 behind pgbouncer in transaction mode)
+        "prepared_statement_cache_size": settings.DATABASE_STATEMENT_CACHE_SIZE,
+    },
 )
 
+
+def engine_pool_stats() -> Dict[str, float]:
+    """
+    Current stats of the sqlalchemy engine pool: connections checked out/in,
+    overflow in use, checkouts waiting and checkout wait times
+
+    Returns:
+        Dict[str, float]
+    """
+    pool = engine.pool
+    checkouts = pool_metrics.checkouts
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": settings.DATABASE_POOL_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        # connections open beyond pool_size
+        "overflow": max(pool.overflow(), 0),
+        "waiting": pool_metrics.waiting,
+        "checkouts": checkouts,
+        "timeouts": pool_metrics.timeouts,
+        "wait_ms_avg": (
+            pool_metrics.wait_seconds_total * 1000 / checkouts if checkouts else 0.0
+        ),
+        "wait_ms_max": pool_metrics.wait_seconds_max * 1000,
+    }
+
+
 # Create async session factory
 AsyncSessionLocal = async_sessionmaker(
     engine,
@@ -7,6 +7,7 @@ from sqlalchemy import (
     Column,
     Enum,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
@@ -34,6 +35,7 @@ class ConversationThread(Base):
         onupdate=func.now(),
         nullable=False,
     )
+    __table_args__ = (Index("ix_conversation_threads_updated_at", "updated_at", "id"),)
 
 
 class Message(Base):
@@ -73,6 +75,16 @@ class Message(Base):
         onupdate=func.now(),
         nullable=False,
     )
+    __table_args__ = (
+        # thread history in order, `id` breaks ties for keyset paging
+        Index(
+            "ix_messages_conversation_id_created_at",
+            "conversation_id",
+            "created_at",
+            "id",
+        ),
+        Index("ix_messages_parent_id", "parent_id"),
+    )
 
 
 class FeedbackReaction(enum.Enum):
@@ -114,3 +126,21 @@ class MessageFeedback(Base):
         # One feedback per AI message
         UniqueConstraint("thread_id", "message_id", name="uq_thread_message_feedback"),
     )
+
+
+class ScrapedPage(Base):
+    __tablename__ = "scraped_pages"
+
+    url_hash = Column(String(32), primary_key=True)
+    url = Column(Text, nullable=False)
+    title = Column(String, nullable=True)
+    snippet = Column(Text, nullable=True)
+    content = Column(Text, nullable=True)
+    etag = Column(String, nullable=True)
+    last_modified = Column(String, nullable=True)
+    fetched_at = Column(
+        TIMESTAMP(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+    )
+    expires_at = Column(TIMESTAMP(timezone=True), nullable=False, index=True)
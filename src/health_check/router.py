@@ -1,6 +1,8 @@
 from fastapi import APIRouter, status
 
 from src.commonlib import types as common_types
+from src.commonlib.postgres_checkpointer import checkpointer_pool_stats
+from src.database.connection import engine_pool_stats
 
 router = APIRouter(prefix="/healthz")
 
@@ -10,3 +12,15 @@ def health_check():
     return common_types.ApiResponseModel(
         status_code=status.HTTP_200_OK, msg="success", data={"message": "healthy"}
     )
+
+
+@router.get("/pools")
+def pool_stats():
+    return common_types.ApiResponseModel(
+        status_code=status.HTTP_200_OK,
+        msg="success",
+        data={
+            "database": engine_pool_stats(),
+            "checkpointer": checkpointer_pool_stats(),
+        },
+    )
@@ -0,0 +1,211 @@
+"""
+Token-budgeted packing of scraped sources into a tool message.
+"""
+
+import re
+from functools import lru_cache
+from typing import List, Optional, Sequence
+
+import tiktoken
+
+from src.commonlib.config import settings
+from src.commonlib.logger import search_logger
+from src.search import types as search_types
+
+TRUNCATION_MARKER = "\n[...]"
+
+_SECTION_PATTERN = re.compile(r"^(?=#{1,6}\s)", re.MULTILINE)
+_PARAGRAPH_PATTERN = re.compile(r"(?<=\n\n)")
+
+
+@lru_cache(maxsize=1)
+def _get_encoding() -> Optional[tiktoken.Encoding]:
+    try:
+        return tiktoken.get_encoding(settings.TOOL_OUTPUT_TOKEN_ENCODING)
+    except Exception as e:  # unknown encoding or offline without a tiktoken cache
+        search_logger.warning(
+            f"Failed to load tiktoken encoding {settings.TOOL_OUTPUT_TOKEN_ENCODING}, "
+            f"estimating tokens from characters: {str(e)}"
+        )
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count the tokens of a text
+
+    Args:
+        text (str): text
+    Returns:
+        int
+    """
+    encoding = _get_encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _cut_tokens(text: str, max_tokens: int) -> str:
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[: max_tokens * 4]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+
+def split_sections(markdown: str) -> List[str]:
+    """
+    Split markdown at heading boundaries, every section starts with its heading
+    (the text before the first heading is a section of its own)
+
+    Args:
+        markdown (str): markdown
+    Returns:
+        List[str]
+    """
+    return [section for section in _SECTION_PATTERN.split(markdown) if section]
+
+
+def truncate_markdown(markdown: str, max_tokens: int) -> str:
+    """
+    Truncate markdown to a token budget at section boundaries.
+
+    Whole sections are kept in order, the first section that does not fit is
+    cut at a paragraph boundary. Only when not even a paragraph fits the text
+    is cut at a token boundary.
+
+    Args:
+        markdown (str): markdown
+        max_tokens (int): token budget
+    Returns:
+        str
+    """
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(markdown) <= max_tokens:
+        return markdown
+
+    budget = max_tokens - count_tokens(TRUNCATION_MARKER)
+    kept: List[str] = []
+    used = 0
+    for section in split_sections(markdown):
+        tokens = count_tokens(section)
+        if used + tokens <= budget:
+            kept.append(section)
+            used += tokens
+            continue
+
+        paragraphs: List[str] = []
+        for paragraph in _PARAGRAPH_PATTERN.split(section):
+            tokens = count_tokens(paragraph)
+            if used + tokens > budget:
+                break
+            paragraphs.append(paragraph)
+            used += tokens
+
+        # a heading without any of its body is just noise
+        if len(paragraphs) == 1 and paragraphs[0].startswith("#"):
+            paragraphs = []
+        kept.extend(paragraphs)
+        break
+
+    if not kept:
+        return _cut_tokens(markdown, max(budget, 0)) + TRUNCATION_MARKER
+    return "".join(kept).rstrip() + TRUNCATION_MARKER
+
+
+def format_source(source: search_types.CompleteSource) -> str:
+    """
+    Format a source for the tool message (`key: value` per non empty field)
+
+    Args:
+        source (search_types.CompleteSource): source
+    Returns:
+        str
+    """
+    tcontent = ""
+    for key, value in source:
+        if value:
+            tcontent += f"{key}: {value}, \n"
+    return tcontent
+
+
+def _allocate(needs: List[int], weights: List[float], budget: int) -> List[int]:
+    """
+    Split a token budget proportionally to weights, capping every share at what
+    the source needs and handing the unused remainder to the other sources
+
+    Args:
+        needs (List[int]): tokens needed by every source
+        weights (List[float]): relevance of every source
+        budget (int): tokens to distribute
+    Returns:
+        List[int]: tokens allocated to every source
+    """
+    weights = [max(weight, 1e-6) for weight in weights]
+    allocation = [0] * len(needs)
+    pending = [i for i, need in enumerate(needs) if need > 0]
+    while pending and budget > 0:
+        total_weight = sum(weights[i] for i in pending)
+        satisfied = []
+        for i in pending:
+            share = int(budget * weights[i] / total_weight)
+            if needs[i] - allocation[i] <= share:
+                satisfied.append(i)
+
+        if not satisfied:
+            # nobody fits in their share: hand out the proportional shares and stop
+            for i in pending:
+                allocation[i] += int(budget * weights[i] / total_weight)
+            break
+
+        for i in satisfied:
+            budget -= needs[i] - allocation[i]
+            allocation[i] = needs[i]
+            pending.remove(i)
+    return allocation
+
+
+def pack_sources(
+    sources: Sequence[search_types.CompleteSource],
+    max_tokens: int = settings.TOOL_OUTPUT_MAX_TOKENS,
+    relevance: Optional[Sequence[float]] = None,
+) -> List[str]:
+    """
+    Format sources into tool message parts that fit a token budget.
+
+    Title, link and snippet of every source are always kept, the remaining
+    budget is shared between the contents by relevance (defaults to the order
+    of `sources`, best first) and every content is truncated at markdown
+    section boundaries.
+
+    Args:
+        sources (Sequence[search_types.CompleteSource]): scraped sources
+        max_tokens (int): token budget of the whole tool message
+        relevance (Optional[Sequence[float]]): relevance score of every source
+    Returns:
+        List[str]: formatted sources
+    """
+    if not sources:
+        return []
+    if relevance is None:
+        relevance = [1.0 / (rank + 1) for rank in range(len(sources))]
+
+    headers = [
+        format_source(source.model_copy(update={"content": None})) for source in sources
+    ]
+    content_budget = max_tokens - sum(count_tokens(header) for header in headers)
+    needs = [count_tokens(source.content or "") for source in sources]
+    allocation = _allocate(needs, list(relevance), max(content_budget, 0))
+
+    packed: List[str] = []
+    for source, need, tokens in zip(sources, needs, allocation):
+        content = source.content or ""
+        if tokens < need:
+            content = truncate_markdown(content, tokens)
+        packed.append(format_source(source.model_copy(update={"content": content})))
+
+    search_logger.info(
+        f"packed {len(sources)} sources, content tokens {sum(needs)} -> {sum(allocation)} "
+        f"(budget {max_tokens})"
+    )
+    return packed
@@ -0,0 +1,144 @@
+"""
+SimHash based near-duplicate elimination across scraped sources.
+"""
+
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Sequence, Set, Tuple
+
+import xxhash
+
+from src.commonlib.config import settings
+from src.commonlib.logger import search_logger
+from src.search import types as search_types
+
+_WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+_PARAGRAPH_PATTERN = re.compile(r"\n\s*\n")
+_BITS = 64
+_BANDS = 4
+_BAND_BITS = _BITS // _BANDS
+_BAND_MASK = (1 << _BAND_BITS) - 1
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """
+    64-bit SimHash of the word shingles of a text
+
+    Args:
+        text (str): text
+        shingle_size (int): words per shingle
+    Returns:
+        int
+    """
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) < shingle_size:
+        shingles = Counter([" ".join(words)])
+    else:
+        shingles = Counter(
+            " ".join(words[i : i + shingle_size])
+            for i in range(len(words) - shingle_size + 1)
+        )
+
+    vector = [0] * _BITS
+    for shingle, weight in shingles.items():
+        digest = xxhash.xxh64_intdigest(shingle)
+        for bit in range(_BITS):
+            vector[bit] += weight if digest >> bit & 1 else -weight
+
+    fingerprint = 0
+    for bit, value in enumerate(vector):
+        if value > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+class SimHashIndex:
+    """
+    Near-duplicate lookup over SimHash fingerprints.
+
+    Fingerprints are indexed by 16-bit bands, two fingerprints within
+    a hamming distance below the number of bands share at least one band.
+    """
+
+    def __init__(self, max_distance: int = settings.DEDUP_MAX_HAMMING_DISTANCE):
+        self._max_distance = min(max_distance, _BANDS - 1)
+        self._bands: List[Dict[int, List[int]]] = [
+            defaultdict(list) for _ in range(_BANDS)
+        ]
+
+    @staticmethod
+    def _band(fingerprint: int, band: int) -> int:
+        return fingerprint >> (band * _BAND_BITS) & _BAND_MASK
+
+    def has_near_duplicate(self, fingerprint: int) -> bool:
+        candidates: Set[int] = set()
+        for band, buckets in enumerate(self._bands):
+            candidates.update(buckets.get(self._band(fingerprint, band), ()))
+        return any(
+            (fingerprint ^ candidate).bit_count() <= self._max_distance
+            for candidate in candidates
+        )
+
+    def add(self, fingerprint: int) -> None:
+        for band, buckets in enumerate(self._bands):
+            buckets[self._band(fingerprint, band)].append(fingerprint)
+
+
+def deduplicate_sources(
+    sources: Sequence[search_types.CompleteSource],
+) -> Tuple[List[search_types.CompleteSource], search_types.DedupReport]:
+    """
+    Drop near-duplicate pages and paragraphs.
+
+    Sources are expected best first: a page that nearly duplicates an earlier
+    page is dropped, then every paragraph (long enough to be meaningful) that
+    nearly duplicates an earlier paragraph of any kept page is removed.
+
+    Args:
+        sources (Sequence[search_types.CompleteSource]): scraped sources, best first
+    Returns:
+        Tuple[List[search_types.CompleteSource], search_types.DedupReport]
+    """
+    report = search_types.DedupReport()
+    pages = SimHashIndex()
+    paragraphs = SimHashIndex()
+    deduplicated: List[search_types.CompleteSource] = []
+
+    for source in sources:
+        content = source.content or ""
+        if content:
+            fingerprint = simhash(content)
+            if pages.has_near_duplicate(fingerprint):
+                report.pages_dropped += 1
+                report.chars_saved += len(content)
+                search_logger.info(f"dropped near-duplicate page url={source.link}")
+                continue
+            pages.add(fingerprint)
+
+        kept: List[str] = []
+        for paragraph in _PARAGRAPH_PATTERN.split(content):
+            if (
+                len(_WORD_PATTERN.findall(paragraph))
+                < settings.DEDUP_MIN_PARAGRAPH_WORDS
+            ):
+                kept.append(paragraph)
+                continue
+
+            fingerprint = simhash(paragraph)
+            if paragraphs.has_near_duplicate(fingerprint):
+                report.paragraphs_dropped += 1
+                report.chars_saved += len(paragraph)
+                continue
+            paragraphs.add(fingerprint)
+            kept.append(paragraph)
+
+        deduplicated.append(
+            source.model_copy(update={"content": "\n\n".join(kept) or None})
+        )
+
+    if report.pages_dropped or report.paragraphs_dropped:
+        search_logger.info(
+            f"dedup dropped {report.pages_dropped} pages and {report.paragraphs_dropped} "
+            f"paragraphs ({report.chars_saved} chars)"
+        )
+    return deduplicated, report
@@ -0,0 +1,154 @@
+"""
+Write-behind persistence of the assistant answers being streamed.
+
+Every running generation registers its output parts; one shared task writes
+the partial answers of all dirty streams with a single multi-row UPDATE per
+tick, so a crashed worker loses at most one interval of output without a
+per-token (or per-stream) database write.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncGenerator, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from src.commonlib.config import settings
+from src.commonlib.logger import search_logger
+from src.search import crud
+
+
+@dataclass
+class PartialAnswer:
+    thread_id: UUID
+    # the generation's own output list, appended to while streaming
+    parts: List[str]
+    persisted_parts: int = 0
+    pending_bytes: int = 0
+
+
+class MessagePersister:
+    """
+    Batch the partial answer checkpoints of all running streams.
+
+    A stream is written every `interval_seconds` while it has new output, or
+    earlier once `flush_bytes` are pending.
+    """
+
+    def __init__(
+        self,
+        interval_seconds: float = settings.MESSAGE_PERSIST_INTERVAL_SECONDS,
+        flush_bytes: int = settings.MESSAGE_PERSIST_FLUSH_BYTES,
+    ):
+        self.interval_seconds = interval_seconds
+        self.flush_bytes = flush_bytes
+        self._answers: Dict[UUID, PartialAnswer] = {}
+        self._wakeup = asyncio.Event()
+
+    def track(self, aim_id: UUID, thread_id: UUID, parts: List[str]) -> None:
+        """
+        Register the output of a running generation
+
+        Args:
+            aim_id (UUID): ai message id
+            thread_id (UUID): thread id
+            parts (List[str]): output parts, appended to by the generation
+        """
+        self._answers[aim_id] = PartialAnswer(thread_id=thread_id, parts=parts)
+
+    def appended(self, aim_id: UUID, size: int) -> None:
+        """
+        Account for `size` characters appended to the output of a stream
+
+        Args:
+            aim_id (UUID): ai message id
+            size (int): appended characters
+        """
+        answer = self._answers.get(aim_id)
+        if answer is None:
+            return
+        answer.pending_bytes += size
+        if answer.pending_bytes >= self.flush_bytes:
+            self._wakeup.set()
+
+    def untrack(self, aim_id: UUID) -> None:
+        """
+        Stop persisting a stream, its final answer is written by the generation
+
+        Args:
+            aim_id (UUID): ai message id
+        """
+        self._answers.pop(aim_id, None)
+
+    def _snapshot(self) -> List[Tuple[UUID, UUID, str]]:
+        rows = []
+        for aim_id, answer in self._answers.items():
+            if len(answer.parts) == answer.persisted_parts:
+                continue
+            answer.persisted_parts = len(answer.parts)
+            answer.pending_bytes = 0
+            rows.append((aim_id, answer.thread_id, "".join(answer.parts)))
+        return rows
+
+    async def flush(self) -> int:
+        """
+        Write the partial answer of every stream with new output
+
+        Returns:
+            int: rows updated
+        """
+        rows = self._snapshot()
+        if not rows:
+            return 0
+        return await crud.update_partial_aimessages(rows)
+
+    async def run(self) -> None:
+        """Flush every `interval_seconds`, or as soon as a stream has `flush_bytes` pending"""
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), timeout=self.interval_seconds
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                search_logger.error(
+                    f"Failed to persist partial answers: {str(e)}",
+                    exc_info=True,
+                )
+
+
+@asynccontextmanager
+async def message_persister_lifespan() -> (
+    AsyncGenerator[Optional[MessagePersister], None]
+):
+    """
+    Run the shared write-behind task for the app lifetime (if enabled)
+    """
+    if not settings.MESSAGE_PERSIST_ENABLED:
+        yield None
+        return
+
+    persister = MessagePersister()
+    task = asyncio.create_task(persister.run())
+    try:
+        yield persister
+    finally:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        # streams still running at shutdown keep what they produced so far
+        try:
+            await persister.flush()
+        except Exception as e:
+            search_logger.error(
+                f"Failed to persist partial answers on shutdown: {str(e)}",
+                exc_info=True,
+            )
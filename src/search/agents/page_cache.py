@@ -0,0 +1,242 @@
+"""
+Two-tier (in-process LRU + postgres) cache of scraped webpages.
+"""
+
+import asyncio
+import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import httpx
+import xxhash
+from pydantic import HttpUrl
+
+from src.commonlib.async_http_client import get_http_client
+from src.commonlib.config import settings
+from src.commonlib.logger import search_logger
+from src.commonlib.lru_cache import LRUCache
+from src.search import crud
+from src.search import types as search_types
+
+# query params that never change the content of a page
+_TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "yclid", "mc_cid", "mc_eid", "ref"}
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalize a url so that trivially different spellings share a cache entry
+    (scheme/host casing, default port, fragment, tracking params, param order, trailing slash)
+
+    Args:
+        url (str): url to normalize
+    Returns:
+        str
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+
+    query = urlencode(
+        sorted(
+            (key, value)
+            for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not key.lower().startswith("utm_")
+            and key.lower() not in _TRACKING_PARAMS
+        )
+    )
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def url_hash(url: str) -> str:
+    """
+    Cache key of a url
+
+    Args:
+        url (str): url (normalized or not)
+    Returns:
+        str: 128-bit xxhash hex digest of the normalized url
+    """
+    return xxhash.xxh3_128_hexdigest(normalize_url(url))
+
+
+def _header(headers: Optional[dict], name: str) -> Optional[str]:
+    for key, value in (headers or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _utcnow() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+class PageCache:
+    """
+    Scraped page cache keyed by normalized url.
+
+    Lookups go to the in-process LRU first and fall back to postgres. Expired
+    entries that carry an ETag/Last-Modified validator are revalidated against
+    the origin with a conditional request before crawl4ai is used again.
+    Cache failures are logged and treated as misses, they never fail a search.
+    """
+
+    def __init__(self):
+        self._lru: LRUCache[search_types.CachedPage] = LRUCache(
+            max_entries=settings.PAGE_CACHE_LRU_MAX_ENTRIES
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return settings.PAGE_CACHE_ENABLED
+
+    def _expires_at(self) -> datetime.datetime:
+        return _utcnow() + datetime.timedelta(seconds=settings.PAGE_CACHE_TTL_SECONDS)
+
+    async def _revalidate(self, page: search_types.CachedPage) -> bool:
+        """
+        Ask the origin whether a stale page is still current
+
+        Args:
+            page (search_types.CachedPage): expired cache entry
+        Returns:
+            bool: True when the origin answered 304 (or the same ETag)
+        """
+        headers = {}
+        if page.etag:
+            headers["If-None-Match"] = page.etag
+        if page.last_modified:
+            headers["If-Modified-Since"] = page.last_modified
+        if not headers:
+            return False
+
+        try:
+            client = get_http_client()
+            async with client.stream(
+                "GET",
+                str(page.source.link),
+                headers=headers,
+                timeout=settings.PAGE_CACHE_REVALIDATE_TIMEOUT,
+                follow_redirects=True,
+            ) as response:
+                # the body is never read, closing the stream drops it
+                if response.status_code == 304:
+                    return True
+                return bool(page.etag) and response.headers.get("etag") == page.etag
+        except httpx.HTTPError as e:
+            search_logger.warning(
+                f"Failed to revalidate cached page url={page.source.link}: {str(e)}"
+            )
+            return False
+
+    async def _refresh(self, page: search_types.CachedPage) -> None:
+        page.expires_at = self._expires_at()
+        self._lru.set(page.url_hash, page)
+        try:
+            await crud.extend_scraped_page(
+                url_hash=page.url_hash, expires_at=page.expires_at
+            )
+        except Exception as e:
+            search_logger.warning(f"Failed to extend cached page expiry: {str(e)}")
+
+    async def get_many(
+        self, urls: Sequence[HttpUrl]
+    ) -> Dict[str, search_types.CompleteSource]:
+        """
+        Get the cached content of several urls
+
+        Args:
+            urls (Sequence[HttpUrl]): requested urls
+        Returns:
+            Dict[str, search_types.CompleteSource]: fresh (or successfully revalidated)
+                pages by requested url, misses are absent
+        """
+        if not self.enabled or not urls:
+            return {}
+
+        keys: Dict[str, str] = {str(url): url_hash(str(url)) for url in urls}
+        entries: Dict[str, search_types.CachedPage] = {}
+        missing: List[str] = []
+        for key in set(keys.values()):
+            page = self._lru.get(key)
+            if page is None:
+                missing.append(key)
+            else:
+                entries[key] = page
+
+        if missing:
+            try:
+                for row in await crud.get_scraped_pages(url_hashes=missing):
+                    page = search_types.CachedPage(
+                        url_hash=row.url_hash,
+                        source=search_types.CompleteSource(
+                            title=row.title or "Untitled",
+                            link=row.url,
+                            snippet=row.snippet,
+                            content=row.content,
+                        ),
+                        etag=row.etag,
+                        last_modified=row.last_modified,
+                        expires_at=row.expires_at,
+                    )
+                    self._lru.set(page.url_hash, page)
+                    entries[page.url_hash] = page
+            except Exception as e:
+                search_logger.warning(f"Failed to read scraped page cache: {str(e)}")
+
+        now = _utcnow()
+        stale = [page for page in entries.values() if page.expires_at <= now]
+        if stale:
+            revalidated = await asyncio.gather(
+                *(self._revalidate(page) for page in stale)
+            )
+            for page, is_valid in zip(stale, revalidated):
+                if is_valid:
+                    await self._refresh(page)
+                else:
+                    entries.pop(page.url_hash, None)
+
+        hits = {url: entries[key].source for url, key in keys.items() if key in entries}
+        search_logger.info(f"page cache: {len(hits)}/{len(keys)} hits")
+        return hits
+
+    async def set_many(
+        self,
+        pages: Sequence[Tuple[search_types.CompleteSource, Optional[dict]]],
+    ) -> None:
+        """
+        Cache freshly scraped pages
+
+        Args:
+            pages (Sequence[Tuple[CompleteSource, Optional[dict]]]): scraped page
+                and the origin response headers (for ETag/Last-Modified)
+        """
+        if not self.enabled or not pages:
+            return
+
+        expires_at = self._expires_at()
+        entries: List[search_types.CachedPage] = []
+        for source, headers in pages:
+            page = search_types.CachedPage(
+                url_hash=url_hash(str(source.link)),
+                source=source,
+                etag=_header(headers, "etag"),
+                last_modified=_header(headers, "last-modified"),
+                expires_at=expires_at,
+            )
+            self._lru.set(page.url_hash, page)
+            entries.append(page)
+
+        try:
+            await crud.upsert_scraped_pages(pages=entries)
+        except Exception as e:
+            search_logger.warning(f"Failed to write scraped page cache: {str(e)}")
+
+
+page_cache = PageCache()
@@ -0,0 +1,170 @@
+"""
+In-process BM25 ranking of scraped page passages against the search query.
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+from src.commonlib.config import settings
+from src.commonlib.logger import search_logger
+from src.search import types as search_types
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+_PARAGRAPH_PATTERN = re.compile(r"\n\s*\n")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how in is it its of on or that the "
+    "this to was were what when where which who why will with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase word tokens without stopwords
+
+    Args:
+        text (str): text
+    Returns:
+        List[str]
+    """
+    return [
+        token
+        for token in _TOKEN_PATTERN.findall(text.lower())
+        if len(token) > 1 and token not in _STOPWORDS
+    ]
+
+
+def split_passages(
+    markdown: str, max_chars: int = settings.RERANK_PASSAGE_MAX_CHARS
+) -> List[str]:
+    """
+    Split markdown into passages of consecutive paragraphs.
+
+    A heading always starts a new passage, paragraphs are merged until the
+    passage would exceed `max_chars` (a single longer paragraph is kept whole).
+
+    Args:
+        markdown (str): markdown
+        max_chars (int): soft maximum passage size
+    Returns:
+        List[str]
+    """
+    passages: List[str] = []
+    current: List[str] = []
+    size = 0
+    for paragraph in _PARAGRAPH_PATTERN.split(markdown):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+
+        if current and (paragraph.startswith("#") or size + len(paragraph) > max_chars):
+            passages.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(paragraph)
+        size += len(paragraph)
+
+    if current:
+        passages.append("\n\n".join(current))
+    return passages
+
+
+class BM25Index:
+    """Okapi BM25 over a small in-memory corpus."""
+
+    def __init__(self, documents: Sequence[str], k1: float = 1.5, b: float = 0.75):
+        self._k1 = k1
+        self._b = b
+        self._term_frequencies: List[Counter] = [
+            Counter(tokenize(document)) for document in documents
+        ]
+        self._lengths = [sum(tf.values()) for tf in self._term_frequencies]
+        self._average_length = (
+            sum(self._lengths) / len(self._lengths) if self._lengths else 0.0
+        )
+
+        document_frequencies: Counter = Counter()
+        for tf in self._term_frequencies:
+            document_frequencies.update(tf.keys())
+        count = len(self._term_frequencies)
+        self._idf: Dict[str, float] = {
+            term: math.log((count - df + 0.5) / (df + 0.5) + 1.0)
+            for term, df in document_frequencies.items()
+        }
+
+    def scores(self, query: str) -> List[float]:
+        """
+        Score every document against a query
+
+        Args:
+            query (str): query
+        Returns:
+            List[float]: score per document (same order as the corpus)
+        """
+        terms = [term for term in set(tokenize(query)) if term in self._idf]
+        scores: List[float] = []
+        for tf, length in zip(self._term_frequencies, self._lengths):
+            norm = self._k1 * (
+                1 - self._b + self._b * length / (self._average_length or 1.0)
+            )
+            score = 0.0
+            for term in terms:
+                frequency = tf.get(term)
+                if frequency:
+                    score += (
+                        self._idf[term]
+                        * frequency
+                        * (self._k1 + 1)
+                        / (frequency + norm)
+                    )
+            scores.append(score)
+        return scores
+
+
+def rerank_sources(
+    query: str,
+    sources: Sequence[search_types.CompleteSource],
+    top_k: int = settings.RERANK_TOP_K,
+) -> Tuple[List[search_types.CompleteSource], List[float]]:
+    """
+    Keep only the passages that best match the query.
+
+    Every page is split into passages, all passages are scored together with
+    BM25 and the global top-k are kept. Each source keeps its selected passages
+    in their original order, its relevance is the sum of their scores.
+
+    Args:
+        query (str): search query
+        sources (Sequence[search_types.CompleteSource]): scraped sources
+        top_k (int): number of passages to keep
+    Returns:
+        Tuple[List[search_types.CompleteSource], List[float]]: sources with the
+            selected passages as content, and the relevance of every source
+    """
+    passages: List[Tuple[int, int, str]] = []
+    for source_index, source in enumerate(sources):
+        for passage_index, passage in enumerate(split_passages(source.content or "")):
+            passages.append((source_index, passage_index, passage))
+
+    if not passages:
+        return list(sources), [0.0] * len(sources)
+
+    scores = BM25Index([passage for _, _, passage in passages]).scores(query)
+    ranked = sorted(range(len(passages)), key=lambda i: scores[i], reverse=True)
+    selected = sorted(ranked[:top_k], key=lambda i: passages[i][:2])
+
+    contents: List[List[str]] = [[] for _ in sources]
+    relevance = [0.0] * len(sources)
+    for i in selected:
+        source_index, _, passage = passages[i]
+        contents[source_index].append(passage)
+        relevance[source_index] += scores[i]
+
+    search_logger.info(
+        f"kept {len(selected)}/{len(passages)} passages from {len(sources)} sources"
+    )
+    reranked = [
+        source.model_copy(update={"content": "\n\n".join(content) or None})
+        for source, content in zip(sources, contents)
+    ]
+    return reranked, relevance
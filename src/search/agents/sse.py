@@ -0,0 +1,273 @@
+"""
+Server-sent events helpers for the agent stream.
+"""
+
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+import orjson
+
+from src.search import types as search_types
+
+COMPACT_MEDIA_PARAMETER = "format=compact"
+DONE_MESSAGE = "[DONE]"
+
+MODE_CODES: Dict[search_types.SseMode, str] = {
+    search_types.SseMode.METADATA: "m",
+    search_types.SseMode.THINKING: "t",
+    search_types.SseMode.RESPONSE: "r",
+    search_types.SseMode.ERROR: "e",
+}
+
+_LINE_BREAK_PATTERN = re.compile(r"\r\n|\r|\n")
+
+# event id (None for frames outside the replay buffer) and event
+SseFrame = Tuple[Optional[int], search_types.SseEvent]
+
+
+def _id_line(event_id: Optional[int]) -> bytes:
+    return b"" if event_id is None else b"id: %d\n" % event_id
+
+
+def negotiate_wire_format(
+    wire_format: Optional[search_types.SseWireFormat], accept: Optional[str]
+) -> search_types.SseWireFormat:
+    """
+    Pick the SSE wire format of a stream, the query parameter wins over the
+    `Accept: text/event-stream; format=compact` header
+
+    Args:
+        wire_format (Optional[search_types.SseWireFormat]): requested by query parameter
+        accept (Optional[str]): Accept header
+    Returns:
+        search_types.SseWireFormat
+    """
+    if wire_format is not None:
+        return wire_format
+    for media_range in (accept or "").split(","):
+        media_type, _, parameters = media_range.partition(";")
+        if media_type.strip().lower() != "text/event-stream":
+            continue
+        if COMPACT_MEDIA_PARAMETER in parameters.replace(" ", "").lower().split(";"):
+            return search_types.SseWireFormat.COMPACT
+    return search_types.SseWireFormat.JSON
+
+
+class SseEncoder:
+    """
+    Current SSE format: one `data:` line with the whole SseEvent as JSON.
+    """
+
+    def open(self) -> Optional[bytes]:
+        """
+        Opening frame of the stream
+
+        Returns:
+            Optional[bytes]: None when the format has no opening frame
+        """
+        return None
+
+    def encode(
+        self, event: search_types.SseEvent, event_id: Optional[int] = None
+    ) -> bytes:
+        """
+        Encode an event into an SSE frame
+
+        Args:
+            event (search_types.SseEvent): event
+            event_id (Optional[int]): SSE event id (resume position)
+        Returns:
+            bytes
+        """
+        return _id_line(event_id) + f"data: {event.model_dump_json()}\n\n".encode(
+            "utf-8"
+        )
+
+
+class CompactSseEncoder(SseEncoder):
+    """
+    Compact SSE format.
+
+    The ids are sent once in an opening `meta` event, every following frame
+    names its mode by a one letter event type (see MODE_CODES). Events without
+    meta carry the raw message as data, events with meta append `x` to the
+    event type and carry `{"message", "meta"}` as JSON. The end of the stream
+    is an empty `done` event.
+    """
+
+    def __init__(
+        self,
+        thread_id: UUID,
+        track_id: UUID,
+        um_id: Optional[UUID],
+        aim_id: Optional[UUID],
+    ):
+        self._ids = {
+            "thread_id": thread_id,
+            "track_id": track_id,
+            "um_id": um_id,
+            "aim_id": aim_id,
+        }
+
+    @staticmethod
+    def _frame(event_type: bytes, data: str, event_id: Optional[int]) -> bytes:
+        # a multi-line payload is split over several data lines, the client
+        # joins them back with "\n"
+        lines = _LINE_BREAK_PATTERN.split(data)
+        return (
+            _id_line(event_id)
+            + b"event: "
+            + event_type
+            + b"\n"
+            + b"".join(b"data: " + line.encode("utf-8") + b"\n" for line in lines)
+            + b"\n"
+        )
+
+    def open(self) -> Optional[bytes]:
+        return (
+            b"event: meta\ndata: "
+            + orjson.dumps(
+                {
+                    **self._ids,
+                    "modes": {code: mode.value for mode, code in MODE_CODES.items()},
+                }
+            )
+            + b"\n\n"
+        )
+
+    def encode(
+        self, event: search_types.SseEvent, event_id: Optional[int] = None
+    ) -> bytes:
+        if (
+            event.mode == search_types.SseMode.RESPONSE
+            and event.message == DONE_MESSAGE
+        ):
+            return _id_line(event_id) + b"event: done\ndata: \n\n"
+
+        code = MODE_CODES[event.mode]
+        if event.meta is None:
+            return self._frame(code.encode(), event.message, event_id)
+        return (
+            _id_line(event_id)
+            + b"event: "
+            + code.encode()
+            + b"x\ndata: "
+            + orjson.dumps({"message": event.message, "meta": event.meta})
+            + b"\n\n"
+        )
+
+
+def get_sse_encoder(
+    wire_format: search_types.SseWireFormat,
+    thread_id: UUID,
+    track_id: UUID,
+    um_id: Optional[UUID],
+    aim_id: Optional[UUID],
+) -> SseEncoder:
+    """
+    Encoder of a stream
+
+    Args:
+        wire_format (search_types.SseWireFormat): negotiated wire format
+        thread_id (UUID): current conversation thread
+        track_id (UUID): track and stop stream
+        um_id (Optional[UUID]): user message id
+        aim_id (Optional[UUID]): ai message id
+    Returns:
+        SseEncoder
+    """
+    if wire_format == search_types.SseWireFormat.COMPACT:
+        return CompactSseEncoder(
+            thread_id=thread_id, track_id=track_id, um_id=um_id, aim_id=aim_id
+        )
+    return SseEncoder()
+
+
+class SseCoalescer:
+    """
+    Batch consecutive RESPONSE tokens into one SSE frame.
+
+    Tokens are held for at most `coalesce_ms` (or until `coalesce_bytes` are
+    buffered) and flushed as a single RESPONSE event. Any other event flushes
+    the pending batch first so the order of events is preserved. A merged
+    frame carries the id of its last token. A zero window disables coalescing
+    (one frame per token).
+    """
+
+    def __init__(self, options: search_types.SseStreamOptions):
+        self._window = options.coalesce_ms / 1000
+        self._max_bytes = options.coalesce_bytes
+        self._pending: Optional[search_types.SseEvent] = None
+        self._pending_id: Optional[int] = None
+        self._parts: List[str] = []
+        self._size = 0
+        self._deadline = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self._window > 0
+
+    @staticmethod
+    def _is_token(event: search_types.SseEvent) -> bool:
+        return (
+            event.mode == search_types.SseMode.RESPONSE
+            and event.meta is None
+            and event.message != DONE_MESSAGE
+        )
+
+    def timeout(self) -> Optional[float]:
+        """
+        Seconds left before the pending batch must be flushed
+
+        Returns:
+            Optional[float]: None when nothing is pending
+        """
+        if self._pending is None:
+            return None
+        return max(0.0, self._deadline - time.monotonic())
+
+    def flush(self) -> List[SseFrame]:
+        """
+        Flush the pending batch
+
+        Returns:
+            List[SseFrame]: the merged RESPONSE event (if any)
+        """
+        if self._pending is None:
+            return []
+
+        event = self._pending.model_copy(update={"message": "".join(self._parts)})
+        self._pending = None
+        self._parts = []
+        self._size = 0
+        return [(self._pending_id, event)]
+
+    def add(
+        self, event: search_types.SseEvent, event_id: Optional[int] = None
+    ) -> List[SseFrame]:
+        """
+        Add an event to the stream
+
+        Args:
+            event (search_types.SseEvent): next event of the agent
+            event_id (Optional[int]): SSE event id
+        Returns:
+            List[SseFrame]: frames to send now
+        """
+        if not self.enabled:
+            return [(event_id, event)]
+        if not self._is_token(event):
+            return [*self.flush(), (event_id, event)]
+
+        if self._pending is None:
+            self._pending = event
+            self._deadline = time.monotonic() + self._window
+        self._pending_id = event_id
+        self._parts.append(event.message)
+        self._size += len(event.message.encode("utf-8"))
+
+        if (self._max_bytes and self._size >= self._max_bytes) or self.timeout() == 0:
+            return self.flush()
+        return []
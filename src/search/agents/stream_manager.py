@@ -1,13 +1,16 @@
 import asyncio
+import contextlib
 import json
 import threading
-from typing import AsyncGenerator, Dict, List, Optional, Tuple
+from typing import AsyncGenerator, Dict, List, Optional, Set, Tuple
 from uuid import UUID
 
 from fastapi import HTTPException, Request
 from langchain.messages import AIMessageChunk, ToolMessage
 from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 
+from src.commonlib import infra_state
+from src.commonlib.config import settings
 from src.commonlib.constants import (
     LLM_RESPONSE_GENERATION_ERROR,
     LLM_RESPONSE_STREAMING_ERROR,
@@ -16,6 +19,13 @@ from src.commonlib.logger import search_logger
 from src.search import crud
 from src.search import types as search_types
 from src.search.agents.agent_manager import AgentManager
+from src.search.agents.sse import SseCoalescer, get_sse_encoder
+from src.search.agents.stream_session import StreamSession
+
+# NOTIFY channel of stream cancellations, the payload is the track id
+STREAM_CANCEL_CHANNEL = "stream_cancel"
+# NOTIFY channel of the worker that cancelled a stream, the payload is the track id
+STREAM_CANCEL_ACK_CHANNEL = "stream_cancel_ack"
 
 
 class StreamManager:
@@ -34,26 +44,14 @@ class StreamManager:
     def __init__(self):
         if not hasattr(self, "_initialized") or not self._initialized:
             self.agent_manager = AgentManager()
-            self.running_agent_tasks: Dict[str, asyncio.Task] = {}
+            self.sessions: Dict[str, StreamSession] = {}
+            # bounded pool of detached generations (running + waiting)
+            self._detached_slots = asyncio.Semaphore(settings.DETACHED_MAX_WORKERS)
+            self._detached_pending = 0
+            # stop requests waiting for another worker's acknowledgment
+            self._cancel_acks: Dict[str, Set[asyncio.Future]] = {}
             self._initialized = True
 
-    def sse_event(self, data: search_types.SseEvent):
-        """
-        Format SSE event.
-
-        Args:
-            data (search_types.SseEvent):
-                mode (SseMode)
-                message (str): llm generated message
-                context (Optional[Dict]): Optional context such as tool call arguments generated by the agent or ToolMessage
-                thread_id (UUID): current conversation thread
-                track_id (UUID): track and stop stream
-                aim_id (Optional[UUID]): previous message
-        Returns:
-            str
-        """
-        return f"data: {data.model_dump_json()}\n\n"
-
     async def stream_events(
         self,
         query: str,
@@ -75,7 +73,7 @@ class StreamManager:
             enable_search (bool): Whether search is enabled
             context: (search_types.Flow): Actual follow up context
         """
-        final_output = ""
+        has_output = False
         error_message = ""
         sources: List[search_types.Source] = []
 
@@ -142,7 +140,7 @@ class StreamManager:
                                 and metadata["langgraph_node"] == "model"
                             ):
                                 token = message_chunk.content
-                                final_output += token
+                                has_output = True
                                 yield search_types.SseEvent(
                                     mode=search_types.SseMode.RESPONSE,
                                     message=token,
@@ -218,8 +216,7 @@ class StreamManager:
                     aim_id=aim_id,
                 )
 
-            if not final_output and not error_message:
-                final_output += LLM_RESPONSE_STREAMING_ERROR
+            if not has_output and not error_message:
                 yield search_types.SseEvent(
                     mode=search_types.SseMode.RESPONSE,
                     message=f"{LLM_RESPONSE_STREAMING_ERROR}",
@@ -274,6 +271,7 @@ class StreamManager:
                 message=json.dumps(
                     [source.model_dump(mode="json") for source in sources]
                 ),
+                sources=sources,
                 thread_id=thread_id,
                 track_id=track_id,
                 um_id=um_id,
@@ -288,6 +286,190 @@ class StreamManager:
                 aim_id=aim_id,
             )
 
+    def get_session(self, track_id: UUID) -> Optional[StreamSession]:
+        """
+        Running (or recently completed) stream of a track on this worker
+
+        Args:
+            track_id (UUID): tracking message id
+        Returns:
+            Optional[StreamSession]
+        """
+        return self.sessions.get(str(track_id))
+
+    def _forget_session(self, session: StreamSession) -> None:
+        track_id_str = str(session.track_id)
+        # a regenerated answer may already have replaced the session of this track
+        if self.sessions.get(track_id_str) is session:
+            self.sessions.pop(track_id_str, None)
+            search_logger.debug(
+                f"Released stream session for thread_id={session.thread_id} track_id={track_id_str}"
+            )
+
+    async def generate(
+        self,
+        session: StreamSession,
+        query: str,
+        enable_search: bool,
+        context: search_types.Flow,
+        slots: Optional[asyncio.Semaphore] = None,
+    ) -> None:
+        """
+        Run the agent of a session, publish its events and persist the answer.
+
+        Runs as the background task of the session, independent of the clients
+        reading it. The partial answer is checkpointed by the shared message
+        persister while streaming, the final answer is written at the end.
+
+        Args:
+            session (StreamSession): stream session
+            query (str): User's natural language query to process
+            enable_search (bool): Whether search is enabled
+            context: (search_types.Flow): Actual follow up context
+            slots (Optional[asyncio.Semaphore]): worker pool to wait for before running the agent
+        """
+        thread_id = session.thread_id
+        track_id = session.track_id
+        # joined once at the end, `+=` per token copies the whole answer again and again
+        output_parts: List[str] = []
+        error_message = ""
+        sources: List[search_types.Source] = []
+        persister = infra_state.message_persister
+        if persister:
+            persister.track(
+                aim_id=session.aim_id, thread_id=thread_id, parts=output_parts
+            )
+        try:
+            async with slots or contextlib.nullcontext():
+                async for event in self.stream_events(
+                    query=query,
+                    thread_id=thread_id,
+                    track_id=str(track_id),
+                    um_id=session.um_id,
+                    aim_id=session.aim_id,
+                    enable_search=enable_search,
+                    context=context,
+                ):
+                    # Accumulate output/sources if needed
+                    if event.mode == search_types.SseMode.RESPONSE:
+                        if event.message != "[DONE]":
+                            output_parts.append(event.message)
+                            if persister:
+                                persister.appended(session.aim_id, len(event.message))
+                    elif event.mode == search_types.SseMode.METADATA:
+                        sources.extend(event.sources or [])
+                    elif event.mode == search_types.SseMode.ERROR:
+                        error_message = event.message
+                        search_logger.info(error_message)
+
+                    session.publish(event)
+
+            search_logger.info(
+                f"Agent completed successfully for thread_id={thread_id}, track_id={track_id}"
+            )
+        except asyncio.CancelledError:
+            search_logger.info(
+                f"Agent cancelled for thread_id={thread_id}, track_id={track_id}, performing cleanup"
+            )
+            error_message = error_message or LLM_RESPONSE_STREAMING_ERROR
+            raise
+        except Exception as e:
+            search_logger.error(
+                f"Agent error for thread_id={thread_id} track_id={track_id}: {e}",
+                exc_info=True,
+            )
+            error_message = str(e)
+        finally:
+            if session.detached:
+                self._detached_pending -= 1
+            session.close()
+            if persister:
+                persister.untrack(session.aim_id)
+            final_output = "".join(output_parts)
+
+            search_logger.info(f"final output: {final_output}")
+            search_logger.info(f"error: {error_message if error_message else None}")
+            search_logger.info(f"sources: {sources if sources else None}")
+            try:
+                # single db call to updated status based on the error or final_message
+                await crud.update_aimessage_in_thread(
+                    thread_id=thread_id,
+                    aim_id=session.aim_id,
+                    content=final_output,
+                    error_message=error_message if error_message else None,
+                    sources=(
+                        [source.model_dump(mode="json") for source in sources]
+                        if sources
+                        else None
+                    ),
+                )
+            except Exception as e:
+                search_logger.error(
+                    f"Failed to persist answer for thread_id={thread_id}, track_id={track_id}: {str(e)}",
+                    exc_info=True,
+                )
+
+    def has_detached_capacity(self) -> bool:
+        """
+        Whether the detached worker pool accepts another generation
+
+        Returns:
+            bool
+        """
+        return (
+            self._detached_pending
+            < settings.DETACHED_MAX_WORKERS + settings.DETACHED_MAX_QUEUED
+        )
+
+    def start(
+        self,
+        query: str,
+        thread_id: UUID,
+        track_id: UUID,
+        um_id: Optional[UUID],
+        aim_id: Optional[UUID],
+        enable_search: bool,
+        context: search_types.Flow,
+        detached: bool = False,
+    ) -> StreamSession:
+        """
+        Start the agent of a track in the background
+
+        Args:
+            query (str): User's natural language query to process
+            thread_id (UUID): Unique identifier for the conversation thread
+            track_id (UUID): Unique identifier to track and stop execution (user message id)
+            um_id (Optional[UUID]): Unique identifier of user message id
+            aim_id (Optional[UUID]): Unique identifier of the ai message id
+            enable_search (bool): Whether search is enabled
+            context: (search_types.Flow): Actual follow up context
+            detached (bool): run to completion in the detached worker pool,
+                regardless of connected clients
+        Returns:
+            StreamSession
+        """
+        session = StreamSession(
+            thread_id=thread_id,
+            track_id=track_id,
+            um_id=um_id,
+            aim_id=aim_id,
+            detached=detached,
+        )
+        if detached:
+            self._detached_pending += 1
+        self.sessions[str(track_id)] = session
+        session.start(
+            self.generate(
+                session=session,
+                query=query,
+                enable_search=enable_search,
+                context=context,
+                slots=self._detached_slots if detached else None,
+            ),
+            on_expire=self._forget_session,
+        )
+        return session
+
     async def run(
         self,
         request: Request,
@@ -298,14 +480,16 @@ class StreamManager:
         aim_id: Optional[UUID],
         enable_search: bool,
         context: search_types.Flow,
-    ):
+        stream_options: search_types.SseStreamOptions = search_types.SseStreamOptions(),
+    ) -> AsyncGenerator[bytes, None]:
         """
-        Execute agent in background task and stream responses with cancellation support.
+        Execute agent in background task and stream responses with resume support.
         flow:
-            - Main coroutine: Consumes from queue and yields SSE events to client
-            - Background task (agent_worker): Runs agent and pushes chunks to queue
-            - Queue: Thread-safe communication channel between producer and consumer
-            - Cancellation: Gracefully stops agent when client disconnects
+            - Background task (generate): Runs agent and publishes events to the stream session
+            - Stream session: Bounded replay buffer of the events, numbered by SSE event id
+            - Main coroutine (attach): Reads the session and yields SSE events to client
+            - Disconnect: the agent keeps running for a grace period so the client can resume
+              with `Last-Event-ID`, it is cancelled when nobody re-attaches in time
 
         Args:
             request (Request): FastAPI request object to check client connection status
@@ -316,205 +500,217 @@ class StreamManager:
             aim_id (Optional[UUID]): Unique identifier of the previous parent message (ai message id)
             enable_search (bool): Whether search is enabled
             context: (search_types.Flow): Actual follow up context
+            stream_options (search_types.SseStreamOptions): SSE wire format and token coalescing options
 
         Yields:
-            str: SSE-formatted events containing agent responses, including:
+            bytes: SSE-formatted events containing agent responses, including:
                 - Planning events (todo list creation)
                 - Tool execution progress messages
                 - Incremental response chunks
                 - Metadata (sources, citations)
                 - Error messages
-
-        Raises:
-            HTTPException: If agent execution fails critically
-            asyncio.CancelledError: If client disconnects
         """
-        agent_task = None
-        track_id_str = str(track_id)
-        chunk_queue: asyncio.Queue[
-            Tuple[search_types.SseMessageType, search_types.SseEvent]
-        ] = asyncio.Queue(maxsize=100)
-
-        async def agent_worker():
-            """Background worker that runs the agent and handles cleanup."""
-            try:
-                agent_generator = self.stream_events(
-                    query=query,
-                    thread_id=thread_id,
-                    track_id=track_id_str,
-                    um_id=um_id,
-                    aim_id=aim_id,
-                    enable_search=enable_search,
-                    context=context,
-                )
-
-                async for chunk in agent_generator:
-                    await chunk_queue.put((search_types.SseMessageType.CHUNK, chunk))
-
-                # Signal completion
-                await chunk_queue.put((search_types.SseMessageType.DONE, None))
-                search_logger.info(
-                    f"Agent completed successfully for thread_id={thread_id}, track_id={track_id}"
-                )
+        session = self.start(
+            query=query,
+            thread_id=thread_id,
+            track_id=track_id,
+            um_id=um_id,
+            aim_id=aim_id,
+            enable_search=enable_search,
+            context=context,
+        )
+
+        async for frame in self.attach(
+            request=request, session=session, stream_options=stream_options
+        ):
+            yield frame
+
+    async def attach(
+        self,
+        request: Request,
+        session: StreamSession,
+        last_event_id: int = 0,
+        stream_options: search_types.SseStreamOptions = search_types.SseStreamOptions(),
+    ) -> AsyncGenerator[bytes, None]:
+        """
+        Stream the events of a session to one client, starting after `last_event_id`
 
-            except asyncio.CancelledError:
-                search_logger.info(
-                    f"Agent cancelled for thread_id={thread_id}, track_id={track_id}, performing cleanup"
-                )
-                await chunk_queue.put(
-                    (
-                        search_types.SseMessageType.CANCELLED,
-                        LLM_RESPONSE_STREAMING_ERROR,
-                    )
-                )
-                raise
+        Args:
+            request (Request): FastAPI request object to check client connection status
+            session (StreamSession): stream session
+            last_event_id (int): last event id received by the client (0 = from the start)
+            stream_options (search_types.SseStreamOptions): SSE wire format and token coalescing options
 
-            except Exception as e:
-                search_logger.error(
-                    f"Agent error for thread_id={thread_id} track_id={track_id}: {e}",
-                    exc_info=True,
-                )
-                await chunk_queue.put((search_types.SseMessageType.ERROR, str(e)))
-                raise
-            finally:
-                self.running_agent_tasks.pop(track_id_str, None)
+        Yields:
+            bytes: SSE-formatted events
+        """
+        thread_id = session.thread_id
+        track_id = session.track_id
+        disconnected = False
+
+        async def disconnect_watcher():
+            """
+            Wait for the ASGI `http.disconnect` message and stop reading.
+
+            The agent is left running, the session cancels it once no client
+            re-attached within the grace period.
+            """
+            nonlocal disconnected
+            while True:
+                message = await request.receive()
+                if message["type"] == "http.disconnect":
+                    break
 
+            disconnected = True
+            search_logger.info(
+                f"Client disconnected for thread_id={thread_id}, track_id={track_id}"
+            )
+            session.wake()
+
+        coalescer = SseCoalescer(options=stream_options)
+        encoder = get_sse_encoder(
+            wire_format=stream_options.wire_format,
+            thread_id=thread_id,
+            track_id=track_id,
+            um_id=session.um_id,
+            aim_id=session.aim_id,
+        )
+        after = last_event_id
+        session.attach()
+        watcher_task = asyncio.create_task(disconnect_watcher())
         try:
-            final_output = ""
-            error_message = ""
-            streaming = True
-            sources: List[search_types.Source] = []
-
-            # Create and track the background task
-            agent_task = asyncio.create_task(agent_worker())
-            self.running_agent_tasks[track_id_str] = agent_task
-
-            # Stream chunks to client while monitoring disconnection
-            while streaming:
-                # Check for disconnection
-                if await request.is_disconnected():
-                    search_logger.info(
-                        f"Client disconnected for thread_id={thread_id}, track_id={track_id}, cancelling agent"
+            opening = encoder.open()
+            if opening:
+                yield opening
+
+            while not disconnected:
+                events = session.read(after)
+                if events is None:
+                    search_logger.warning(
+                        f"Client fell behind the replay buffer for thread_id={thread_id}, track_id={track_id}"
                     )
+                    break
 
-                    # Cancel the agent task (cleanup will happen in except block)
-                    if agent_task and not agent_task.done():
-                        agent_task.cancel()
-                        try:
-                            await agent_task
-                        except asyncio.CancelledError:
-                            search_logger.info(
-                                f"Agent task cancelled for track_id={track_id}"
-                            )
+                for event_id, event in events:
+                    after = event_id
+                    for frame_id, frame in coalescer.add(event, event_id):
+                        yield encoder.encode(frame, frame_id)
 
-                    streaming = False
+                if session.closed and after >= session.last_event_id:
                     break
+                if events:
+                    continue
 
-                # Get next chunk with timeout
-                try:
-                    chunk = await asyncio.wait_for(chunk_queue.get(), timeout=0.5)
-                    chunk_type, chunk_content = chunk
-                    if chunk_type == search_types.SseMessageType.CHUNK:
-                        # Accumulate output/sources if needed
-                        if chunk_content.mode == search_types.SseMode.RESPONSE:
-                            if chunk_content.message != "[DONE]":
-                                final_output += chunk_content.message
-                        elif chunk_content.mode == search_types.SseMode.METADATA:
-                            try:
-                                metadata = json.loads(chunk_content.message)
-                                sources.extend(metadata)
-                            except Exception:
-                                search_logger.warning("failed to parse sources")
-                                sources.extend([])
-                        elif chunk_content.mode == search_types.SseMode.ERROR:
-                            error_message = chunk_content.message
-                            search_logger.info(error_message)
-
-                        yield self.sse_event(data=chunk_content)
-
-                    elif chunk_type == search_types.SseMessageType.DONE:
-                        search_logger.info(
-                            f"Agent stream ended for thread_id={thread_id}, track_id={track_id}"
-                        )
-                        streaming = False
-                        break
-                    elif (
-                        chunk_type == search_types.SseMessageType.ERROR
-                        or chunk_type == search_types.SseMessageType.CANCELLED
-                    ):
-                        error_message = chunk_content
-                        break
-                except asyncio.TimeoutError:
-                    # No chunk available, loop back to check disconnection
+                # only wait with a timeout while a coalesced batch is pending
+                flush_timeout = coalescer.timeout()
+                if flush_timeout == 0:
+                    for frame_id, frame in coalescer.flush():
+                        yield encoder.encode(frame, frame_id)
                     continue
+                await session.wait(after, timeout=flush_timeout)
 
-            search_logger.info(f"final output: {final_output}")
-            search_logger.info(f"error: {error_message if error_message else None}")
-            search_logger.info(f"sources: {sources if sources else None}")
-            # single db call to updated status based on the error or final_message
-            await crud.update_aimessage_in_thread(
-                thread_id=thread_id,
-                aim_id=aim_id,
-                content=final_output,
-                error_message=error_message if error_message else None,
-                sources=sources if sources else None,
-            )
-        except Exception as e:
-            search_logger.error(
-                f"Error in stream consumer for thread_id={thread_id}, track_id={track_id}: {str(e)}",
-                exc_info=True,
-            )
-            if agent_task and not agent_task.done():
-                agent_task.cancel()
-                try:
-                    await agent_task
-                except asyncio.CancelledError:
-                    raise
-            raise
+            if not disconnected:
+                for frame_id, frame in coalescer.flush():
+                    yield encoder.encode(frame, frame_id)
         finally:
-            # 1. Cleanup task reference
-            self.running_agent_tasks.pop(track_id_str, None)
-
-            # 2. Ensure agent task is done
-            if agent_task and not agent_task.done():
-                agent_task.cancel()
-                try:
-                    await asyncio.wait_for(agent_task, timeout=1.0)
-                except (asyncio.CancelledError, asyncio.TimeoutError):
-                    pass
-
-            # 3. Explicitly delete reference (helps GC, but not strictly necessary)
-            del chunk_queue
+            session.detach()
+            watcher_task.cancel()
             search_logger.debug(
-                f"Cleaned up all resources for thread_id={thread_id} track_id={track_id}"
+                f"Detached client for thread_id={thread_id} track_id={track_id}"
+            )
+
+    async def on_cancel_notification(self, payload: str) -> None:
+        """
+        Cancel a stream of this worker on a notification of another worker and
+        acknowledge it
+
+        Args:
+            payload (str): track id
+        """
+        session = self.sessions.get(payload)
+        if session is None or not session.cancel():
+            return
+        search_logger.info(
+            f"Cancelled stream on notification for thread_id={session.thread_id}, track_id={payload}"
+        )
+        await infra_state.notify_bus.publish(STREAM_CANCEL_ACK_CHANNEL, payload)
+
+    def on_cancel_ack_notification(self, payload: str) -> None:
+        """
+        A worker cancelled a stream this worker asked to stop
+
+        Args:
+            payload (str): track id
+        """
+        for ack in self._cancel_acks.get(payload, ()):
+            if not ack.done():
+                ack.set_result(None)
+
+    async def _request_remote_cancel(
+        self, track_id: UUID
+    ) -> search_types.StreamCancelResult:
+        """
+        Broadcast a cancellation and wait for the worker running the stream
+        to acknowledge it
+
+        Args:
+            track_id (UUID): tracking message id
+        Returns:
+            search_types.StreamCancelResult: REQUESTED when this worker cannot
+                receive the acknowledgment (listener disconnected)
+        """
+        notify_bus = infra_state.notify_bus
+        if not notify_bus.connected:
+            await notify_bus.publish(STREAM_CANCEL_CHANNEL, str(track_id))
+            return search_types.StreamCancelResult.REQUESTED
+
+        key = str(track_id)
+        ack = asyncio.get_running_loop().create_future()
+        waiting = self._cancel_acks.setdefault(key, set())
+        waiting.add(ack)
+        try:
+            await notify_bus.publish(STREAM_CANCEL_CHANNEL, key)
+            await asyncio.wait_for(
+                ack, timeout=settings.STREAM_CANCEL_ACK_TIMEOUT_SECONDS
             )
+        except asyncio.TimeoutError:
+            return search_types.StreamCancelResult.NOT_RUNNING
+        finally:
+            waiting.discard(ack)
+            if not waiting:
+                self._cancel_acks.pop(key, None)
 
-    async def stop_stream_message(self, track_id: UUID) -> bool:
+        search_logger.info(f"Another worker cancelled track_id={track_id}")
+        return search_types.StreamCancelResult.CANCELLED
+
+    async def stop_stream_message(
+        self, track_id: UUID
+    ) -> search_types.StreamCancelResult:
         """
-        Cancel the running search job/message
+        Cancel the running search job/message, on this worker or (through a
+        postgres notification) on whichever worker runs it
 
         Args:
             track_id (UUID): tracking message id
         Returns:
-            bool
+            search_types.StreamCancelResult: NOT_RUNNING if no worker runs the
+                stream (finished, already cancelled or unknown)
         """
         try:
-            track_id_str = str(track_id)
-            if track_id_str not in self.running_agent_tasks:
-                return False
+            session = self.get_session(track_id)
+            if session is None:
+                if infra_state.notify_bus is None:
+                    return search_types.StreamCancelResult.NOT_RUNNING
+                return await self._request_remote_cancel(track_id)
 
-            task = self.running_agent_tasks.get(track_id_str)
-            if task is None or task.done():
-                return False
+            if not session.cancel():
+                return search_types.StreamCancelResult.NOT_RUNNING
 
-            # cancel and delete the track_id entry
-            task.cancel()
-            self.running_agent_tasks.pop(track_id_str, None)
             try:
-                await task
+                await session.task
             except asyncio.CancelledError:
                 pass
 
-            return True
+            return search_types.StreamCancelResult.CANCELLED
         except Exception:
             raise
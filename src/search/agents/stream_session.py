@@ -0,0 +1,220 @@
+"""
+In-memory state of a running agent stream, shared by every SSE connection
+attached to it.
+"""
+
+import asyncio
+from collections import deque
+from typing import Callable, Deque, List, Optional, Tuple
+from uuid import UUID
+
+from src.commonlib.config import settings
+from src.commonlib.logger import search_logger
+from src.search import types as search_types
+
+
+class StreamSession:
+    """
+    Agent task of one track plus a bounded replay buffer of its events.
+
+    Every event gets an increasing sequence number (the SSE event id). Clients
+    read the buffer from any id it still covers and then follow the live
+    events, so a reconnecting client continues where it left off while the
+    agent keeps running. When the last client detaches the agent is cancelled
+    after a grace period unless someone re-attaches in the meantime (a detached
+    session always runs to completion). A closed session stays available for
+    the same grace period.
+    """
+
+    def __init__(
+        self,
+        thread_id: UUID,
+        track_id: UUID,
+        um_id: Optional[UUID],
+        aim_id: Optional[UUID],
+        detached: bool = False,
+        buffer_size: int = settings.STREAM_REPLAY_BUFFER_SIZE,
+        grace_seconds: float = settings.STREAM_RESUME_GRACE_SECONDS,
+    ):
+        self.thread_id = thread_id
+        self.track_id = track_id
+        self.um_id = um_id
+        self.aim_id = aim_id
+        self.detached = detached
+        self.task: Optional[asyncio.Task] = None
+        self.closed = False
+
+        self._buffer: Deque[Tuple[int, search_types.SseEvent]] = deque(
+            maxlen=buffer_size
+        )
+        self._last_id = 0
+        self._changed = asyncio.Event()
+        self._subscribers = 0
+        self._grace_seconds = grace_seconds
+        self._grace_handle: Optional[asyncio.TimerHandle] = None
+        self._on_expire: Optional[Callable[["StreamSession"], None]] = None
+
+    @property
+    def last_event_id(self) -> int:
+        return self._last_id
+
+    @property
+    def first_event_id(self) -> int:
+        return self._buffer[0][0] if self._buffer else self._last_id + 1
+
+    def state(self) -> search_types.StreamState:
+        """
+        Status of the session
+
+        Returns:
+            search_types.StreamState
+        """
+        return search_types.StreamState(
+            thread_id=self.thread_id,
+            track_id=self.track_id,
+            um_id=self.um_id,
+            aim_id=self.aim_id,
+            status=(
+                search_types.StreamStatus.COMPLETED
+                if self.closed
+                else search_types.StreamStatus.RUNNING
+            ),
+            detached=self.detached,
+            last_event_id=self._last_id,
+        )
+
+    def start(
+        self, coro, on_expire: Optional[Callable[["StreamSession"], None]] = None
+    ) -> asyncio.Task:
+        """
+        Run the agent coroutine of the session
+
+        Args:
+            coro: coroutine publishing the events and closing the session
+            on_expire: called once the session should be forgotten
+        Returns:
+            asyncio.Task
+        """
+        self._on_expire = on_expire
+        self.task = asyncio.create_task(coro)
+        return self.task
+
+    def _wake(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def publish(self, event: search_types.SseEvent) -> int:
+        """
+        Append an event to the replay buffer and wake the readers
+
+        Args:
+            event (search_types.SseEvent): event
+        Returns:
+            int: event id
+        """
+        self._last_id += 1
+        self._buffer.append((self._last_id, event))
+        self._wake()
+        return self._last_id
+
+    def close(self) -> None:
+        """Mark the stream as complete, readers stop after the last event"""
+        self.closed = True
+        self._wake()
+        self._schedule_expiry()
+
+    def covers(self, last_event_id: int) -> bool:
+        """
+        Whether every event after `last_event_id` is still buffered
+
+        Args:
+            last_event_id (int): last event id received by the client
+        Returns:
+            bool
+        """
+        return self.first_event_id <= last_event_id + 1 <= self._last_id + 1
+
+    def cancel(self) -> bool:
+        """
+        Cancel the agent task
+
+        Returns:
+            bool: False if the agent was not running
+        """
+        if self.task is None or self.task.done():
+            return False
+        self.task.cancel()
+        return True
+
+    def _schedule_expiry(self) -> None:
+        if self._grace_handle is not None:
+            self._grace_handle.cancel()
+        self._grace_handle = asyncio.get_running_loop().call_later(
+            self._grace_seconds, self._expire
+        )
+
+    def _expire(self) -> None:
+        self._grace_handle = None
+        if not self.closed:
+            if self.detached:
+                return
+            search_logger.info(
+                f"No client re-attached to track_id={self.track_id} within "
+                f"{self._grace_seconds}s, cancelling agent"
+            )
+            self.cancel()
+            return
+        if self._subscribers == 0 and self._on_expire:
+            self._on_expire(self)
+
+    def attach(self) -> None:
+        """Register a reader, stops a pending grace period"""
+        self._subscribers += 1
+        if self._grace_handle is not None and not self.closed:
+            self._grace_handle.cancel()
+            self._grace_handle = None
+
+    def detach(self) -> None:
+        """Unregister a reader, the last one starts the grace period"""
+        self._subscribers -= 1
+        if self._subscribers == 0:
+            self._schedule_expiry()
+
+    def wake(self) -> None:
+        """Wake the readers (e.g. to notice that their client went away)"""
+        self._wake()
+
+    def read(self, after: int) -> Optional[List[Tuple[int, search_types.SseEvent]]]:
+        """
+        Buffered events after an event id
+
+        Args:
+            after (int): last event id already received (0 = from the start)
+        Returns:
+            Optional[List[Tuple[int, search_types.SseEvent]]]: event ids and events,
+                None when the buffer no longer covers `after`
+        """
+        if after >= self._last_id:
+            return []
+        start = after + 1 - self.first_event_id
+        if start < 0:
+            return None
+        return [self._buffer[i] for i in range(start, len(self._buffer))]
+
+    async def wait(self, after: int, timeout: Optional[float] = None) -> None:
+        """
+        Wait for an event after `after`, the end of the stream or a wake up
+
+        Args:
+            after (int): last event id already received
+            timeout (Optional[float]): seconds to wait at most
+        """
+        if after < self._last_id or self.closed:
+            return
+        if timeout is None:
+            await self._changed.wait()
+            return
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
@@ -1,19 +1,68 @@
-import asyncio
-from typing import Any, Dict, List, Optional
+from contextlib import aclosing
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import httpx
 from langchain.messages import ToolMessage
 from langchain.tools import ToolException, ToolRuntime, tool
 from langgraph.config import get_stream_writer
+from langgraph.types import StreamWriter
 from pydantic import HttpUrl
 
 from src.commonlib.async_crawl4AI_client import AsyncCrawl4AIClient
+from src.commonlib.async_serper_client import AsyncSerperClient
 from src.commonlib.config import settings
 from src.commonlib.logger import search_logger
-from src.commonlib.types import Crawl4AIResponse
+from src.commonlib.types import Crawl4AIResponse, Crawl4AIResponseResult
 from src.search import types as search_types
+from src.search.agents.context_packing import pack_sources
+from src.search.agents.dedup import deduplicate_sources
+from src.search.agents.page_cache import page_cache
+from src.search.agents.passage_ranking import rerank_sources
 
 crawl4ai_client = AsyncCrawl4AIClient()
+serper_client = AsyncSerperClient()
+
+
+def to_complete_source(
+    url: HttpUrl, crawler_data: Crawl4AIResponseResult
+) -> Optional[search_types.CompleteSource]:
+    """Convert a crawl4ai result to a CompleteSource.
+
+    Args:
+        url (HttpUrl): requested URL
+        crawler_data (Crawl4AIResponseResult): crawl4ai result for the url
+
+    Returns:
+        Optional[search_types.CompleteSource]
+    """
+    if crawler_data.markdown is None or crawler_data.metadata is None:
+        return None
+
+    metadata = crawler_data.metadata or {}
+
+    title = (
+        metadata.get("title")
+        or metadata.get("og:title")
+        or metadata.get("twitter:title")
+        or "Untitled"
+    )
+
+    meta_description = (
+        metadata.get("description")
+        or metadata.get("og:description")
+        or metadata.get("twitter:description")
+    )
+
+    markdown = (
+        crawler_data.markdown.markdown_with_citations or crawler_data.markdown.markdown
+    )
+
+    return search_types.CompleteSource(
+        title=title.strip(),
+        link=url,
+        snippet=meta_description,
+        content=markdown,
+    )
 
 
 async def scrape_webpage_content(url: HttpUrl) -> Optional[search_types.CompleteSource]:
@@ -21,7 +70,6 @@ async def scrape_webpage_content(url: HttpUrl) -> Optional[search_types.Complete
 
     Args:
         url (HttpUrl): URL to fetch
-        timeout: Request timeout in seconds
 
     Returns:
         Optional[search_types.CompleteSource]
@@ -32,12 +80,11 @@ async def scrape_webpage_content(url: HttpUrl) -> Optional[search_types.Complete
     """
 
     try:
-        try:
-            c4ai_response: Crawl4AIResponse = await crawl4ai_client.scrape(url=url)
+        cached = await page_cache.get_many(urls=[url])
+        if str(url) in cached:
+            return cached[str(url)]
 
-        except Exception as e:
-            print(f"crawl4ai exception: {str(e)}")
-            raise e
+        c4ai_response: Crawl4AIResponse = await crawl4ai_client.scrape(url=url)
 
         if c4ai_response is not None and (
             c4ai_response.success is False or len(c4ai_response.results) == 0
@@ -45,49 +92,154 @@ async def scrape_webpage_content(url: HttpUrl) -> Optional[search_types.Complete
             raise Exception("Failed to scrape the url")
 
         crawler_data = c4ai_response.results[0]
-
-        if crawler_data.markdown is not None and crawler_data.metadata is not None:
-            metadata = crawler_data.metadata or {}
-
-            title = (
-                metadata.get("title")
-                or metadata.get("og:title")
-                or metadata.get("twitter:title")
-                or "Untitled"
-            )
-
-            meta_description = (
-                metadata.get("description")
-                or metadata.get("og:description")
-                or metadata.get("twitter:description")
-            )
-
-            markdown = (
-                crawler_data.markdown.markdown_with_citations
-                or crawler_data.markdown.markdown
-            )
-
-            return search_types.CompleteSource(
-                title=title.strip(),
-                link=url,
-                snippet=meta_description,
-                content=markdown,
-            )
-
-        return None
+        webpage = to_complete_source(url=url, crawler_data=crawler_data)
+        if webpage is not None:
+            await page_cache.set_many(pages=[(webpage, crawler_data.response_headers)])
+        return webpage
     except httpx.TimeoutException as te:
         search_logger.error(
-            f"Error fetching content, Search request timed out for {url}: {str(e)}"
+            f"Error fetching content, Search request timed out for {url}: {str(te)}"
         )
         raise te
     except httpx.HTTPError as he:
-        search_logger.error(f"Error fetching content for {url}: {str(e)}")
+        search_logger.error(f"Error fetching content for {url}: {str(he)}")
         raise he
     except Exception as e:
         search_logger.error(f"Unexpected error during search for {url}: {str(e)}")
         raise e
 
 
+async def scrape_webpages(urls: List[HttpUrl]) -> List[search_types.CompleteSource]:
+    """Fetch and convert several webpages to markdown with batched crawl4ai requests.
+
+    Scraped pages are written to the page cache.
+
+    Args:
+        urls (List[HttpUrl]): URLs to fetch
+
+    Returns:
+        List[search_types.CompleteSource]: scraped pages, in the order of `urls`
+            (urls that could not be scraped are skipped)
+    """
+    scraped = await crawl4ai_client.scrape_many(urls=urls)
+
+    webpages: List[Tuple[search_types.CompleteSource, Optional[dict]]] = []
+    for url in urls:
+        crawler_data = scraped.get(str(url))
+        if crawler_data is None or not crawler_data.success:
+            search_logger.warning(f"Failed to scrape the url={url}")
+            continue
+
+        webpage = to_complete_source(url=url, crawler_data=crawler_data)
+        if webpage is not None:
+            webpages.append((webpage, crawler_data.response_headers))
+
+    await page_cache.set_many(pages=webpages)
+    return [webpage for webpage, _ in webpages]
+
+
+def has_enough_content(webpages: Sequence[search_types.CompleteSource]) -> bool:
+    """Whether the gathered pages reach the streaming page count or byte budget.
+
+    Args:
+        webpages (Sequence[search_types.CompleteSource]): gathered pages
+
+    Returns:
+        bool
+    """
+    if (
+        settings.CRAWL4AI_STREAM_ENOUGH_PAGES
+        and len(webpages) >= settings.CRAWL4AI_STREAM_ENOUGH_PAGES
+    ):
+        return True
+
+    scraped_bytes = sum(
+        len((webpage.content or "").encode("utf-8")) for webpage in webpages
+    )
+    return bool(
+        settings.CRAWL4AI_STREAM_ENOUGH_BYTES
+        and scraped_bytes >= settings.CRAWL4AI_STREAM_ENOUGH_BYTES
+    )
+
+
+async def stream_webpages(
+    urls: List[HttpUrl],
+    writer: StreamWriter,
+    gathered: Sequence[search_types.CompleteSource] = (),
+) -> List[search_types.CompleteSource]:
+    """Fetch webpages with crawl4ai streaming mode and stop early once enough content is gathered.
+
+    A progress event is emitted for every finished page. Scraping stops after
+    CRAWL4AI_STREAM_ENOUGH_PAGES pages or CRAWL4AI_STREAM_ENOUGH_BYTES bytes of
+    markdown (whichever comes first, 0 disables the limit), counting the pages
+    that were already gathered (e.g. from the page cache). Scraped pages are
+    written to the page cache.
+
+    Args:
+        urls (List[HttpUrl]): URLs to fetch
+        writer (StreamWriter): langgraph custom stream writer
+        gathered (Sequence[search_types.CompleteSource]): pages already gathered
+
+    Returns:
+        List[search_types.CompleteSource]: scraped pages, in completion order
+    Raises:
+        httpx.TimeoutException
+        httpx.HTTPError
+    """
+    requested = {str(url): url for url in urls}
+    webpages: List[search_types.CompleteSource] = []
+    cacheable: List[Tuple[search_types.CompleteSource, Optional[dict]]] = []
+
+    if has_enough_content(gathered):
+        return webpages
+
+    try:
+        async with aclosing(crawl4ai_client.scrape_stream(urls=urls)) as results:
+            async for crawler_data in results:
+                url = crawl4ai_client.match_url(list(requested), crawler_data)
+                if url is None or not crawler_data.success:
+                    search_logger.warning(
+                        f"Failed to scrape the url={crawler_data.url}"
+                    )
+                    continue
+
+                webpage = to_complete_source(
+                    url=requested[url], crawler_data=crawler_data
+                )
+                if webpage is None:
+                    continue
+
+                webpages.append(webpage)
+                cacheable.append((webpage, crawler_data.response_headers))
+                writer(
+                    search_types.CustomMessage(
+                        message=f"Scraped {webpage.title}",
+                        meta={
+                            "url": url,
+                            "scraped": len(webpages),
+                            "total": len(requested),
+                        },
+                    ).model_dump_json()
+                )
+
+                if has_enough_content([*gathered, *webpages]):
+                    search_logger.info(
+                        f"Gathered enough content ({len(gathered) + len(webpages)} pages), "
+                        "stop scraping remaining urls"
+                    )
+                    break
+    except (httpx.TimeoutException, httpx.HTTPError) as e:
+        # keep whatever finished before the stream failed
+        if not webpages:
+            raise e
+        search_logger.warning(
+            f"crawl4ai stream failed after {len(webpages)} pages: {str(e)}"
+        )
+
+    await page_cache.set_many(pages=cacheable)
+    return webpages
+
+
 @tool("internet_search", parse_docstring=True)
 async def internet_search(query: str, runtime: ToolRuntime[Dict, Any]) -> ToolMessage:
     """
@@ -105,34 +257,14 @@ async def internet_search(query: str, runtime: ToolRuntime[Dict, Any]) -> ToolMe
     """
     writer = get_stream_writer()
 
-    payload = {
-        "q": query,
-        "gl": settings.SERPER_DEFAULT_COUNTRY,
-        "hl": settings.SERPER_DEFAULT_LANGUAGE,
-        "tbs": settings.SERPER_DEFAULT_DATE_RANGE,
-    }
-
-    headers = {
-        "X-API-KEY": settings.SERPER_API_KEY,
-        "Content-Type": "application/json",
-    }
-
     writer(
         search_types.CustomMessage(message=f"Searching for: {query}").model_dump_json()
     )
 
     try:
-        async with httpx.AsyncClient(timeout=8.0) as client:
-            response = await client.post(
-                settings.SERPER_API_URL, headers=headers, json=payload
-            )
-            search_logger.info(
-                f"fetch web sources from internet with status_code: {response.status_code}"
-            )
-            response.raise_for_status()
-            data = response.json()
+        data = await serper_client.search(query=query)
 
-            search_logger.info(data)
+        search_logger.info(data)
 
         if isinstance(data, Dict):
             results = data.get("organic", [])
@@ -141,8 +273,6 @@ async def internet_search(query: str, runtime: ToolRuntime[Dict, Any]) -> ToolMe
             raise ToolException("Failed to get result from serper.api")
 
         urls: List[HttpUrl] = []
-        tasks: List[asyncio.Task] = []
-        formatted_results: List[str] = []
         sources: List[search_types.Source] = []
 
         writer(
@@ -158,26 +288,42 @@ async def internet_search(query: str, runtime: ToolRuntime[Dict, Any]) -> ToolMe
                     url = HttpUrl(result["link"])
                     urls.append(url)
                     search_logger.info(f"scraping webpage for url={url}")
-                    tasks.append(scrape_webpage_content(url=url))
                 except Exception as e:
                     search_logger.warning(f"Scaping error: {str(e)}")
                     continue
 
-        webpages: List[Optional[search_types.Source] | BaseException] = (
-            await asyncio.gather(*tasks, return_exceptions=True)
-        )
+        cached = await page_cache.get_many(urls=urls)
+        webpages = [cached[str(url)] for url in urls if str(url) in cached]
+        misses = [url for url in urls if str(url) not in cached]
+        if cached:
+            writer(
+                search_types.CustomMessage(
+                    message=f"Loaded {len(webpages)} sources from cache"
+                ).model_dump_json()
+            )
+
+        if misses and settings.CRAWL4AI_STREAM_ENABLED:
+            webpages.extend(
+                await stream_webpages(urls=misses, writer=writer, gathered=webpages)
+            )
+        elif misses:
+            webpages.extend(await scrape_webpages(urls=misses))
         writer(
             search_types.CustomMessage(
                 message="Scraped the required sources"
             ).model_dump_json()
         )
-        for webpage in webpages:
-            if webpage is not None and not isinstance(webpage, Exception):
-                tcontent = ""
-                for key, value in webpage:
-                    if value:
-                        tcontent += f"{key}: {value}, \n"
-                formatted_results.append(tcontent)
+        # keep serper's ranking (streamed pages arrive in completion order)
+        ranks = {str(url): rank for rank, url in enumerate(urls)}
+        webpages.sort(key=lambda webpage: ranks.get(str(webpage.link), len(ranks)))
+        dedup_report = search_types.DedupReport()
+        if settings.DEDUP_ENABLED:
+            webpages, dedup_report = deduplicate_sources(sources=webpages)
+
+        relevance = None
+        if settings.RERANK_ENABLED:
+            webpages, relevance = rerank_sources(query=query, sources=webpages)
+        formatted_results = pack_sources(sources=webpages, relevance=relevance)
 
         return ToolMessage(
             content=(
@@ -187,7 +333,10 @@ async def internet_search(query: str, runtime: ToolRuntime[Dict, Any]) -> ToolMe
             ),
             name="internet_search",
             tool_call_id=runtime.tool_call_id,
-            additional_kwargs={"sources": sources},
+            additional_kwargs={
+                "sources": sources,
+                "dedup": dedup_report.model_dump(),
+            },
         )
 
     except httpx.TimeoutException:
@@ -230,12 +379,8 @@ async def fetch_url_content(
     try:
         result = await scrape_webpage_content(url=url)
         if result:
-            tcontent = ""
-            for key, value in result:
-                if value:
-                    tcontent += f"{key}: {value}, \n"
             return ToolMessage(
-                content=tcontent,
+                content=pack_sources(sources=[result])[0],
                 name="fetch_url_content",
                 tool_call_id=runtime.tool_call_id,
                 additional_kwargs={
@@ -1,18 +1,34 @@
-from typing import Dict, List, Optional, Tuple
+import datetime
+import uuid
+from typing import Dict, List, Optional, Sequence, Tuple
 from uuid import UUID
 
 from fastapi import HTTPException
 from langchain_core.messages import ai
+from sqlalchemy import Text, bindparam, column
 from sqlalchemy import delete as sql_delete
-from sqlalchemy import func, select
+from sqlalchemy import func
+from sqlalchemy import insert as sql_insert
+from sqlalchemy import select, text, tuple_
+from sqlalchemy import update as sql_update
+from sqlalchemy import values
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.commonlib import infra_state
 from src.commonlib.constants import API_ERROR_MESSAGE
 from src.commonlib.logger import search_logger
 from src.database.connection import AsyncSessionLocal
-from src.database.model import ConversationThread, Message, MessageFeedback
+from src.database.model import (
+    ConversationThread,
+    Message,
+    MessageFeedback,
+    ScrapedPage,
+)
 from src.search import types as search_types
+from src.search.thread_list_cache import thread_list_cache
 
 
 async def create_thread(
@@ -27,6 +43,7 @@ async def create_thread(
     db.add(new_thread)
     await db.commit()
     await db.refresh(new_thread)
+    thread_list_cache.invalidate()
     return new_thread
 
 
@@ -70,32 +87,148 @@ async def get_message(
 
 
 async def list_conversations(
-    db: AsyncSession, thread_id: UUID, page: int, page_size: int
-) -> Tuple[int, List[Message]]:
-    """List all messages in a conversation with pagination"""
-    # Get total count
-    total_count = (
-        await db.execute(
-            select(func.count(Message.id)).where(Message.conversation_id == thread_id)
-        )
-    ).scalar()
+    db: AsyncSession,
+    thread_id: UUID,
+    page: int,
+    page_size: int,
+    cursor: Optional[search_types.PageCursor] = None,
+    total: search_types.TotalCount = search_types.TotalCount.EXACT,
+) -> Tuple[Optional[int], List[Message], Optional[search_types.PageCursor]]:
+    """
+    List the messages of a conversation, newest page first, in chronological
+    order within a page.
 
-    # Get paginated messages
-    messages = (
-        (
+    With a cursor the page starts right before the oldest message of the
+    previous page (keyset on `(created_at, id)`), otherwise `page` is used as
+    an offset.
+
+    Args:
+        db (AsyncSession): database session
+        thread_id (UUID): thread id
+        page (int): page number, ignored when a cursor is given
+        page_size (int): messages per page
+        cursor (Optional[search_types.PageCursor]): position of the previous page
+        total (search_types.TotalCount): count the thread messages (the estimate
+            is exact, a thread is counted on its index)
+    Returns:
+        Tuple[Optional[int], List[Message], Optional[search_types.PageCursor]]:
+            total count, messages and the cursor of the next (older) page
+    """
+    total_count = None
+    if total != search_types.TotalCount.NONE:
+        total_count = (
             await db.execute(
-                select(Message)
-                .where(Message.conversation_id == thread_id)
-                .order_by(Message.created_at.desc())
-                .offset((page - 1) * page_size)
-                .limit(page_size)
+                select(func.count(Message.id)).where(
+                    Message.conversation_id == thread_id
+                )
             )
-        )
-        .scalars()
-        .all()
+        ).scalar()
+
+    query = (
+        select(Message)
+        .where(Message.conversation_id == thread_id)
+        .order_by(Message.created_at.desc(), Message.id.desc())
+        .limit(page_size + 1)
     )
+    if cursor:
+        query = query.where(
+            tuple_(Message.created_at, Message.id) < tuple_(cursor.position, cursor.id)
+        )
+    else:
+        query = query.offset((page - 1) * page_size)
+    messages = (await db.execute(query)).scalars().all()
+
+    next_cursor = None
+    if len(messages) > page_size:
+        messages = messages[:page_size]
+        next_cursor = search_types.PageCursor(
+            position=messages[-1].created_at, id=messages[-1].id
+        )
 
-    return total_count, reversed(messages)
+    return total_count, list(reversed(messages)), next_cursor
+
+
+# message columns in model order, the textual select below maps them positionally
+_MESSAGE_COLUMNS = ", ".join(f"m.{column.name}" for column in Message.__table__.columns)
+
+# leaf (default: latest message without replies) up to the root, with the
+# ordered ids of each node's siblings (same parent, or the thread roots)
+ACTIVE_PATH_SQL = f"""
+WITH RECURSIVE path AS (
+    SELECT m.id, m.parent_id, 0 AS depth
+    FROM messages m
+    WHERE m.conversation_id = :thread_id
+      AND m.id = coalesce(
+          :leaf_id,
+          (
+              SELECT latest.id FROM messages latest
+              WHERE latest.conversation_id = :thread_id
+                AND NOT EXISTS (
+                    SELECT 1 FROM messages c WHERE c.parent_id = latest.id
+                )
+              ORDER BY latest.created_at DESC, latest.id DESC
+              LIMIT 1
+          )
+      )
+    UNION ALL
+    SELECT m.id, m.parent_id, path.depth + 1
+    FROM messages m
+    JOIN path ON m.id = path.parent_id
+    WHERE m.conversation_id = :thread_id
+)
+SELECT {_MESSAGE_COLUMNS}, siblings.sibling_ids
+FROM path
+JOIN messages m ON m.id = path.id
+CROSS JOIN LATERAL (
+    SELECT array_agg(s.id ORDER BY s.created_at, s.id) AS sibling_ids
+    FROM (
+        SELECT child.id, child.created_at FROM messages child
+        WHERE child.parent_id = path.parent_id
+        UNION ALL
+        SELECT root.id, root.created_at FROM messages root
+        WHERE path.parent_id IS NULL
+          AND root.conversation_id = :thread_id
+          AND root.parent_id IS NULL
+    ) s
+) siblings
+ORDER BY path.depth DESC
+"""
+
+
+async def get_active_path(
+    db: AsyncSession, thread_id: UUID, leaf_id: Optional[UUID] = None
+) -> List[Tuple[Message, List[UUID]]]:
+    """
+    Messages of one branch, from the root down to `leaf_id`, in a single
+    recursive query (walks `parent_id`, served by its index).
+
+    Args:
+        db (AsyncSession): database session
+        thread_id (UUID): thread id
+        leaf_id (Optional[UUID]): last message of the branch, defaults to the
+            latest leaf (message without replies) of the thread
+    Returns:
+        List[Tuple[Message, List[UUID]]]: messages with the ordered ids of their
+            siblings (themselves included), empty when the leaf is unknown
+    """
+    statement = (
+        text(ACTIVE_PATH_SQL)
+        .bindparams(
+            bindparam("thread_id", type_=PG_UUID(as_uuid=True)),
+            bindparam("leaf_id", type_=PG_UUID(as_uuid=True)),
+        )
+        .columns(
+            *Message.__table__.columns,
+            column("sibling_ids", ARRAY(PG_UUID(as_uuid=True))),
+        )
+    )
+    rows = await db.execute(
+        select(Message, statement.selected_columns.sibling_ids).from_statement(
+            statement
+        ),
+        {"thread_id": thread_id, "leaf_id": leaf_id},
+    )
+    return [(message, list(sibling_ids)) for message, sibling_ids in rows.all()]
 
 
 async def delete_thread(db: AsyncSession, thread_id: UUID):
@@ -105,6 +238,7 @@ async def delete_thread(db: AsyncSession, thread_id: UUID):
         sql_delete(ConversationThread).where(ConversationThread.id == thread_id)
     )
     await db.commit()
+    thread_list_cache.invalidate()
     await infra_state.checkpointer.adelete_thread(thread_id)
 
 
@@ -115,31 +249,88 @@ async def update_thread(
     thread.title = body.query[:100] if len(body.query) > 100 else body.query
     await db.commit()
     await db.refresh(thread)
+    thread_list_cache.invalidate()
     return thread
 
 
-async def list_threads(
-    db: AsyncSession, page: int = 1, page_size: int = 10
-) -> Tuple[int, List[ConversationThread]]:
-    """List all conversations/threads with pagination"""
-    # Get total count
-    total_count = (await db.execute(select(func.count(ConversationThread.id)))).scalar()
-
-    # Get paginated threads
-    threads = (
-        (
+async def count_threads(
+    db: AsyncSession, total: search_types.TotalCount
+) -> Optional[int]:
+    """
+    Count the threads, exactly or from the planner statistics (no table scan)
+
+    Args:
+        db (AsyncSession): database session
+        total (search_types.TotalCount): count mode
+    Returns:
+        Optional[int]: None for TotalCount.NONE
+    """
+    if total == search_types.TotalCount.NONE:
+        return None
+
+    if total == search_types.TotalCount.ESTIMATE:
+        # -1 until the table was first vacuumed/analyzed
+        estimate = (
             await db.execute(
-                select(ConversationThread)
-                .order_by(ConversationThread.updated_at.desc())
-                .offset((page - 1) * page_size)
-                .limit(page_size)
+                text(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:name)"
+                ),
+                {"name": ConversationThread.__tablename__},
             )
-        )
-        .scalars()
-        .all()
+        ).scalar()
+        if estimate is not None and estimate >= 0:
+            return estimate
+
+    return (await db.execute(select(func.count(ConversationThread.id)))).scalar()
+
+
+async def list_threads(
+    db: AsyncSession,
+    page: int = 1,
+    page_size: int = 10,
+    cursor: Optional[search_types.PageCursor] = None,
+    total: search_types.TotalCount = search_types.TotalCount.EXACT,
+) -> Tuple[Optional[int], List[ConversationThread], Optional[search_types.PageCursor]]:
+    """
+    List the threads, most recently updated first.
+
+    With a cursor the page starts right after the last thread of the previous
+    page (keyset on `(updated_at, id)`), otherwise `page` is used as an offset.
+
+    Args:
+        db (AsyncSession): database session
+        page (int): page number, ignored when a cursor is given
+        page_size (int): threads per page
+        cursor (Optional[search_types.PageCursor]): position of the previous page
+        total (search_types.TotalCount): count mode
+    Returns:
+        Tuple[Optional[int], List[ConversationThread], Optional[search_types.PageCursor]]:
+            total count, threads and the cursor of the next page
+    """
+    total_count = await count_threads(db=db, total=total)
+
+    query = (
+        select(ConversationThread)
+        .order_by(ConversationThread.updated_at.desc(), ConversationThread.id.desc())
+        .limit(page_size + 1)
     )
+    if cursor:
+        query = query.where(
+            tuple_(ConversationThread.updated_at, ConversationThread.id)
+            < tuple_(cursor.position, cursor.id)
+        )
+    else:
+        query = query.offset((page - 1) * page_size)
+    threads = (await db.execute(query)).scalars().all()
+
+    next_cursor = None
+    if len(threads) > page_size:
+        threads = threads[:page_size]
+        next_cursor = search_types.PageCursor(
+            position=threads[-1].updated_at, id=threads[-1].id
+        )
 
-    return total_count, threads
+    return total_count, threads, next_cursor
 
 
 async def create_message(
@@ -170,6 +361,109 @@ async def create_message(
             await session.close()
 
 
+async def create_turn(
+    thread_id: UUID,
+    query: Optional[str],
+    parent_message_id: Optional[UUID],
+    follow_context: Optional[Dict] = None,
+    um_id: Optional[UUID] = None,
+    with_user_message: bool = True,
+) -> Tuple[Optional[Message], Message]:
+    """
+    Create the user message and the assistant placeholder of a chat turn in
+    one transaction and a single `INSERT ... RETURNING` (no refresh).
+
+    The ids are generated here so the assistant row can reference the user
+    row within the same statement. The assistant row is stamped 1 µs after
+    the user row, `now()` is the transaction time and the `id` tiebreak of
+    the history ordering is random.
+
+    Args:
+        thread_id (UUID): thread id
+        query (Optional[str]): user message content
+        parent_message_id (Optional[UUID]): parent of the user message (previous ai message)
+        follow_context (Optional[Dict]): flow context stored on both messages
+        um_id (Optional[UUID]): parent of the assistant message without a user message
+        with_user_message (bool): False to only create the assistant message (regenerate)
+    Returns:
+        Tuple[Optional[Message], Message]: user message (None when not created)
+            and assistant message
+    """
+    rows = []
+    user_message_id = None
+    if with_user_message:
+        user_message_id = uuid.uuid4()
+        rows.append(
+            {
+                "id": user_message_id,
+                "conversation_id": thread_id,
+                "role": search_types.MessageRole.USER.value,
+                "parent_id": parent_message_id,
+                "content": query,
+                "follow_context": follow_context or None,
+                "created_at": func.now(),
+                "updated_at": func.now(),
+            }
+        )
+    ai_message_id = uuid.uuid4()
+    ai_created_at = func.now()
+    if with_user_message:
+        ai_created_at = func.now() + text("interval '1 microsecond'")
+    rows.append(
+        {
+            "id": ai_message_id,
+            "conversation_id": thread_id,
+            "role": search_types.MessageRole.ASSISTANT.value,
+            "parent_id": user_message_id or um_id,
+            "content": None,
+            "follow_context": follow_context or None,
+            "created_at": ai_created_at,
+            "updated_at": ai_created_at,
+        }
+    )
+
+    async with AsyncSessionLocal() as session:
+        async with session.begin():
+            messages = {
+                message.id: message
+                for message in await session.scalars(
+                    # one multi-row VALUES statement (bulk parameters would
+                    # split the rows by their None columns)
+                    sql_insert(Message)
+                    .values(rows)
+                    .returning(Message)
+                )
+            }
+    thread_list_cache.invalidate()
+    return messages.get(user_message_id), messages[ai_message_id]
+
+
+async def create_chat_turn(
+    thread_id: UUID, body: search_types.ConversationAPIRequest
+) -> Tuple[Optional[Message], Message]:
+    """
+    Create the messages of a chat completions request: the user message and
+    the assistant placeholder, or only the assistant message on regenerate
+
+    Args:
+        thread_id (UUID): thread id
+        body (search_types.ConversationAPIRequest): chat completions request
+    Returns:
+        Tuple[Optional[Message], Message]: user message (None on regenerate)
+            and assistant message
+    """
+    regenerate = body.context.type == search_types.FlowType.REGENERATE.value
+    return await create_turn(
+        thread_id=thread_id,
+        query=body.query,
+        parent_message_id=body.parent_message_id,  # previous ai message
+        follow_context=body.context.model_dump(mode="json"),
+        # previous human message, only regenerate flows carry it
+        um_id=body.context.um_id if regenerate else None,
+        with_user_message=not regenerate,
+    )
+
+
 async def update_aimessage_in_thread(
     thread_id: UUID,
     aim_id: UUID,
@@ -177,34 +471,77 @@ async def update_aimessage_in_thread(
     error_message: Optional[str] = None,
     sources: Optional[dict] = None,
 ) -> Message:
-    """Add a new message to an existing thread"""
+    """Store the final answer of an ai message (single UPDATE ... RETURNING)"""
     async with AsyncSessionLocal() as session:
         try:
-
             ai_message = (
                 await session.execute(
-                    select(Message).where(
-                        Message.id == aim_id, Message.conversation_id == thread_id
+                    sql_update(Message)
+                    .where(Message.id == aim_id, Message.conversation_id == thread_id)
+                    .values(
+                        content=content,
+                        error_message=error_message,
+                        sources=sources,
                     )
+                    .returning(Message)
                 )
             ).scalar_one_or_none()
             if not ai_message:
                 raise HTTPException(status_code=500, detail=API_ERROR_MESSAGE)
 
-            # Update the message
-            ai_message.content = content
-            ai_message.error_message = error_message
-            ai_message.sources = sources
-
             await session.commit()
-            await session.refresh(ai_message)
-            return ai_message
         except Exception:
             await session.rollback()
             raise
         finally:
             await session.close()
 
+    thread_list_cache.invalidate()
+    return ai_message
+
+
+async def update_partial_aimessages(rows: Sequence[Tuple[UUID, UUID, str]]) -> int:
+    """
+    Checkpoint the partial content of streaming ai messages, one multi-row
+    UPDATE for all of them.
+
+    Content only ever grows while streaming, a row is skipped when the stored
+    content is not shorter (e.g. the final answer was written meanwhile).
+
+    Args:
+        rows (Sequence[Tuple[UUID, UUID, str]]): (ai message id, thread id, content)
+    Returns:
+        int: rows updated
+    """
+    if not rows:
+        return 0
+
+    partial = values(
+        column("id", PG_UUID(as_uuid=True)),
+        column("conversation_id", PG_UUID(as_uuid=True)),
+        column("content", Text),
+        name="partial",
+    ).data(list(rows))
+    statement = (
+        sql_update(Message)
+        .where(
+            Message.id == partial.c.id,
+            Message.conversation_id == partial.c.conversation_id,
+            func.coalesce(func.length(Message.content), 0)
+            < func.length(partial.c.content),
+        )
+        .values(content=partial.c.content)
+        .execution_options(synchronize_session=False)
+    )
+    async with AsyncSessionLocal() as session:
+        try:
+            result = await session.execute(statement)
+            await session.commit()
+            return result.rowcount
+        except Exception:
+            await session.rollback()
+            raise
+
 
 # feedback
 async def upsert_feedback(
@@ -290,3 +627,95 @@ async def delete_feedback(
             f"Error deleting semantic search feedback: {e}", exc_info=True
         )
         raise
+
+
+# scraped page cache
+async def get_scraped_pages(url_hashes: Sequence[str]) -> List[ScrapedPage]:
+    """
+    Get cached scraped pages (fresh or stale)
+
+    Args:
+        url_hashes (Sequence[str]): hashes of the normalized urls
+    Returns:
+        List[ScrapedPage]
+    """
+    if not url_hashes:
+        return []
+
+    async with AsyncSessionLocal() as session:
+        return (
+            (
+                await session.execute(
+                    select(ScrapedPage).where(ScrapedPage.url_hash.in_(url_hashes))
+                )
+            )
+            .scalars()
+            .all()
+        )
+
+
+async def upsert_scraped_pages(pages: Sequence[search_types.CachedPage]) -> None:
+    """
+    Insert or replace cached scraped pages in a single statement
+
+    Args:
+        pages (Sequence[search_types.CachedPage]): pages to cache
+    """
+    if not pages:
+        return
+
+    rows = {
+        page.url_hash: {
+            "url_hash": page.url_hash,
+            "url": str(page.source.link),
+            "title": page.source.title,
+            "snippet": page.source.snippet,
+            "content": page.source.content,
+            "etag": page.etag,
+            "last_modified": page.last_modified,
+            "expires_at": page.expires_at,
+        }
+        for page in pages
+    }
+    statement = pg_insert(ScrapedPage).values(list(rows.values()))
+    statement = statement.on_conflict_do_update(
+        index_elements=[ScrapedPage.url_hash],
+        set_={
+            "url": statement.excluded.url,
+            "title": statement.excluded.title,
+            "snippet": statement.excluded.snippet,
+            "content": statement.excluded.content,
+            "etag": statement.excluded.etag,
+            "last_modified": statement.excluded.last_modified,
+            "expires_at": statement.excluded.expires_at,
+            "fetched_at": func.now(),
+        },
+    )
+    async with AsyncSessionLocal() as session:
+        try:
+            await session.execute(statement)
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+
+async def extend_scraped_page(url_hash: str, expires_at: datetime.datetime) -> None:
+    """
+    Extend the expiry of a cached page after a successful revalidation
+
+    Args:
+        url_hash (str): hash of the normalized url
+        expires_at (datetime.datetime): new expiry
+    """
+    async with AsyncSessionLocal() as session:
+        try:
+            await session.execute(
+                sql_update(ScrapedPage)
+                .where(ScrapedPage.url_hash == url_hash)
+                .values(expires_at=expires_at)
+            )
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
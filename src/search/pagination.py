@@ -0,0 +1,44 @@
+"""
+Opaque keyset pagination cursors for the thread and message listings.
+
+A cursor is the url-safe base64 of the sort position and id of the last row
+of a page, the next page starts strictly after it.
+"""
+
+import base64
+from typing import Optional
+
+import orjson
+
+from src.search import types as search_types
+
+
+def encode_cursor(cursor: search_types.PageCursor) -> str:
+    """
+    Args:
+        cursor (search_types.PageCursor): position of the last row of a page
+    Returns:
+        str: opaque cursor
+    """
+    payload = orjson.dumps([cursor.position.isoformat(), str(cursor.id)])
+    return base64.urlsafe_b64encode(payload).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[search_types.PageCursor]:
+    """
+    Args:
+        cursor (Optional[str]): opaque cursor sent back by the client
+    Returns:
+        Optional[search_types.PageCursor]: None for the first page
+    Raises:
+        ValueError: if the cursor was not produced by `encode_cursor`
+    """
+    if not cursor:
+        return None
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position, id = orjson.loads(payload)
+        return search_types.PageCursor(position=position, id=id)
+    # binascii, orjson and pydantic errors are all ValueErrors
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"invalid cursor: {cursor}") from e
@@ -1,7 +1,16 @@
-from typing import cast
+from typing import Optional, cast
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.responses import StreamingResponse
 
@@ -9,7 +18,13 @@ from src.commonlib import infra_state
 from src.commonlib import types as common_types
 from src.commonlib.constants import (
     API_ERROR_MESSAGE,
+    DETACHED_POOL_FULL_ERROR,
+    INVALID_CURSOR_ERROR,
+    MESSAGE_NOT_FOUND_ERROR,
     SEARCH_JOB_CANCEL_ERROR,
+    SEARCH_JOB_CANCEL_REQUESTED,
+    STREAM_NOT_FOUND_ERROR,
+    STREAM_REPLAY_EXPIRED_ERROR,
     THREAD_DELETED_ERROR,
     THREAD_NOT_FOUND_ERROR,
 )
@@ -17,36 +32,108 @@ from src.commonlib.logger import search_logger
 from src.database.connection import get_db
 from src.search import crud
 from src.search import types as search_types
+from src.search.agents.sse import negotiate_wire_format
 from src.search.agents.stream_manager import StreamManager
+from src.search.pagination import decode_cursor, encode_cursor
+from src.search.thread_list_cache import etag_matches, thread_list_cache
 
 router = APIRouter(prefix="/thread")
 
 
+def page_cursor(
+    cursor: Optional[str] = Query(
+        None,
+        description="`next_cursor` of the previous page, takes precedence over `page`",
+    ),
+) -> Optional[search_types.PageCursor]:
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=INVALID_CURSOR_ERROR,
+        )
+
+
+def pagination(
+    page: int,
+    page_size: int,
+    count: Optional[int],
+    next_cursor: Optional[search_types.PageCursor],
+) -> dict:
+    return {
+        "page": page,
+        "page_size": page_size,
+        "total_threads": count,
+        "total_pages": (
+            (count + page_size - 1) // page_size if count is not None else None
+        ),
+        "next_cursor": encode_cursor(next_cursor) if next_cursor else None,
+    }
+
+
 @router.get("/list")
 async def list_threads(
     page: int = Query(1, ge=1, description="Page number (starts from 1)"),
     page_size: int = Query(10, ge=1, le=100, description="Number of messages per page"),
+    cursor: Optional[search_types.PageCursor] = Depends(page_cursor),
+    total: search_types.TotalCount = Query(
+        search_types.TotalCount.EXACT,
+        description="Total count: exact, estimate (planner statistics) or none",
+    ),
+    if_none_match: Optional[str] = Header(
+        None,
+        alias="If-None-Match",
+        description="ETag of the copy held by the client, answered with 304 when current",
+    ),
     db: AsyncSession = Depends(get_db),
 ):
+    """
+    List the threads, served from the thread list cache when possible (no
+    database access on a hit).
+    """
     try:
-        count, threads = await crud.list_threads(db=db, page=page, page_size=page_size)
-        print(count)
+        key = (
+            page,
+            page_size,
+            encode_cursor(cursor) if cursor else None,
+            total.value,
+        )
+        cached = thread_list_cache.get(key)
+        if cached is None:
+            version = thread_list_cache.version
+            count, threads, next_cursor = await crud.list_threads(
+                db=db, page=page, page_size=page_size, cursor=cursor, total=total
+            )
+            cached = thread_list_cache.set(
+                key,
+                data={
+                    "threads": [
+                        search_types.ConversationThread.model_validate(
+                            thread
+                        ).model_dump()
+                        for thread in threads
+                    ],
+                    "pagination": pagination(
+                        page=page,
+                        page_size=page_size,
+                        count=count,
+                        next_cursor=next_cursor,
+                    ),
+                },
+                version=version,
+            )
+
+        # the browser revalidates every time, unchanged lists cost a 304
+        headers = {"ETag": cached.etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(if_none_match, cached.etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
 
         return common_types.ApiResponseModel(
             status_code=status.HTTP_200_OK,
             msg="success",
-            data={
-                "threads": [
-                    search_types.ConversationThread.model_validate(thread).model_dump()
-                    for thread in threads
-                ],
-                "pagination": {
-                    "page": page,
-                    "page_size": page_size,
-                    "total_threads": count,
-                    "total_pages": (count + page_size - 1) // page_size,
-                },
-            },
+            data=cached.data,
+            headers=headers,
         )
     except HTTPException as e:
         search_logger.error(f"Error: {str(e)}", exc_info=True)
@@ -87,6 +174,11 @@ async def list_conversations(
     thread_id: UUID,
     page: int = Query(1, ge=1, description="Page number (starts from 1)"),
     page_size: int = Query(10, ge=1, le=100, description="Number of messages per page"),
+    cursor: Optional[search_types.PageCursor] = Depends(page_cursor),
+    total: search_types.TotalCount = Query(
+        search_types.TotalCount.EXACT,
+        description="Total count: exact (estimate is exact for a thread) or none",
+    ),
     db: AsyncSession = Depends(get_db),
 ):
     try:
@@ -97,8 +189,13 @@ async def list_conversations(
                 detail=THREAD_NOT_FOUND_ERROR,
             )
 
-        count, messages = await crud.list_conversations(
-            db=db, thread_id=thread_id, page=page, page_size=page_size
+        count, messages, next_cursor = await crud.list_conversations(
+            db=db,
+            thread_id=thread_id,
+            page=page,
+            page_size=page_size,
+            cursor=cursor,
+            total=total,
         )
 
         return common_types.ApiResponseModel(
@@ -109,12 +206,71 @@ async def list_conversations(
                     search_types.Message.model_validate(message).model_dump()
                     for message in messages
                 ],
-                "pagination": {
-                    "page": page,
-                    "page_size": page_size,
-                    "total_threads": count,
-                    "total_pages": (count + page_size - 1) // page_size,
-                },
+                "pagination": pagination(
+                    page=page,
+                    page_size=page_size,
+                    count=count,
+                    next_cursor=next_cursor,
+                ),
+            },
+        )
+    except HTTPException as e:
+        search_logger.error(f"Error: {str(e)}", exc_info=True)
+        raise e
+    except Exception as e:
+        search_logger.error(f"Error: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=API_ERROR_MESSAGE,
+        )
+
+
+@router.get("/{thread_id}/path")
+async def active_path(
+    thread_id: UUID,
+    leaf_id: Optional[UUID] = Query(
+        None,
+        description="Last message of the branch, defaults to the latest message without replies",
+    ),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Messages of the active branch, from the root down to the leaf message, with
+    the siblings of every message to switch branches.
+    Args:
+        thread_id (UUID): thread id
+        leaf_id (Optional[UUID]): last message of the branch
+    Raises:
+        HTTPException: If the thread or the leaf message is not found
+    """
+    try:
+        db_thread = await crud.get_thread(db=db, thread_id=thread_id)
+        if not db_thread:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=THREAD_NOT_FOUND_ERROR,
+            )
+
+        path = await crud.get_active_path(db=db, thread_id=thread_id, leaf_id=leaf_id)
+        if leaf_id and not path:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=MESSAGE_NOT_FOUND_ERROR,
+            )
+
+        return common_types.ApiResponseModel(
+            status_code=status.HTTP_200_OK,
+            msg="success",
+            data={
+                "messages": [
+                    search_types.PathMessage(
+                        **search_types.Message.model_validate(message).model_dump(),
+                        sibling_ids=sibling_ids,
+                        sibling_index=sibling_ids.index(message.id),
+                        sibling_count=len(sibling_ids),
+                    ).model_dump()
+                    for message, sibling_ids in path
+                ],
             },
         )
     except HTTPException as e:
@@ -183,56 +339,95 @@ async def update_thread(
         )
 
 
+def sse_stream_options(
+    request: Request,
+    coalesce_ms: int = Query(
+        0,
+        ge=0,
+        le=1000,
+        description="Batch response tokens into one SSE frame per window (0 = one frame per token)",
+    ),
+    coalesce_bytes: int = Query(
+        0,
+        ge=0,
+        le=65536,
+        description="Flush a batch of response tokens early once it reaches this size (0 = no limit)",
+    ),
+    wire_format: Optional[search_types.SseWireFormat] = Query(
+        None,
+        description="SSE wire format, defaults to the Accept header (`text/event-stream; format=compact`) or json",
+    ),
+) -> search_types.SseStreamOptions:
+    return search_types.SseStreamOptions(
+        wire_format=negotiate_wire_format(
+            wire_format=wire_format, accept=request.headers.get("accept")
+        ),
+        coalesce_ms=coalesce_ms,
+        coalesce_bytes=coalesce_bytes,
+    )
+
+
 @router.post("/{thread_id}/chat/completions")
 async def conversation(
-    request: Request, thread_id: UUID, body: search_types.ConversationAPIRequest
+    request: Request,
+    thread_id: UUID,
+    body: search_types.ConversationAPIRequest,
+    stream_options: search_types.SseStreamOptions = Depends(sse_stream_options),
 ) -> StreamingResponse:
     try:
-        user_message = None
-        if body.context.type != search_types.FlowType.REGENERATE.value:
-            user_message = await crud.create_message(
-                thread_id=thread_id,
-                role=search_types.MessageRole.USER,
-                parent_message_id=body.parent_message_id,  # previous ai message
-                query=body.query,
-                follow_context=body.context.model_dump(mode="json"),
+        if body.detached and not infra_state.stream_manager.has_detached_capacity():
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=DETACHED_POOL_FULL_ERROR,
             )
+
+        user_message, ai_message = await crud.create_chat_turn(
+            thread_id=thread_id, body=body
+        )
+        if user_message:
             search_logger.info(
                 f"Created message {search_types.MessageRole.USER.value} message_id={user_message.id} under thread_id={thread_id}"
             )
-
-        ai_message = await crud.create_message(
-            thread_id=thread_id,
-            role=search_types.MessageRole.ASSISTANT,
-            parent_message_id=(
-                user_message.id
-                if user_message and user_message.id
-                else body.context.um_id
-            ),  # previous human message
-            query=None,
-            follow_context=body.context.model_dump(mode="json"),
-        )
         search_logger.info(
             f"Created message {search_types.MessageRole.ASSISTANT.value} message_id={ai_message.id} under thread_id={thread_id}"
         )
 
+        track_id = (
+            user_message.id
+            if user_message and user_message.id
+            else body.parent_message_id
+        )
+        um_id = (
+            user_message.id if user_message and user_message.id else body.context.um_id
+        )
+
+        if body.detached:
+            session = infra_state.stream_manager.start(
+                query=body.query,
+                thread_id=thread_id,
+                track_id=track_id,
+                um_id=um_id,
+                aim_id=ai_message.id,  # ai message for next user message
+                enable_search=body.enable_search,
+                context=body.context,
+                detached=True,
+            )
+            return common_types.ApiResponseModel(
+                status_code=status.HTTP_202_ACCEPTED,
+                msg="success",
+                data=session.state().model_dump(),
+            )
+
         generator = infra_state.stream_manager.run(
             request=request,
             query=body.query,
             thread_id=thread_id,
-            track_id=(
-                user_message.id
-                if user_message and user_message.id
-                else body.parent_message_id
-            ),
-            um_id=(
-                user_message.id
-                if user_message and user_message.id
-                else body.context.um_id
-            ),
+            track_id=track_id,
+            um_id=um_id,
             aim_id=ai_message.id,  # ai message for next user message
             enable_search=body.enable_search,
             context=body.context,
+            stream_options=stream_options,
         )
         return StreamingResponse(
             generator,
@@ -250,6 +445,108 @@ async def conversation(
         )
 
 
+@router.get("/{thread_id}/chat/completions/{track_id}/status")
+async def stream_status(thread_id: UUID, track_id: UUID):
+    """
+    Poll the status of a running (or just completed) stream, e.g. a detached
+    generation. Once the stream expired the answer is read from the thread.
+    Args:
+        thread_id (UUID): thread id
+        track_id (UUID): track id of the stream (user message id)
+    Raises:
+        HTTPException: If the stream is unknown or expired
+    """
+    try:
+        session = infra_state.stream_manager.get_session(track_id)
+        if session is None or session.thread_id != thread_id:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=STREAM_NOT_FOUND_ERROR,
+            )
+
+        return common_types.ApiResponseModel(
+            status_code=status.HTTP_200_OK,
+            msg="success",
+            data=session.state().model_dump(),
+        )
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        search_logger.error(f"Error: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=API_ERROR_MESSAGE,
+        )
+
+
+@router.get("/{thread_id}/chat/completions/{track_id}/resume")
+async def resume_conversation(
+    request: Request,
+    thread_id: UUID,
+    track_id: UUID,
+    last_event_id: Optional[int] = Header(
+        None,
+        ge=0,
+        alias="Last-Event-ID",
+        description="Last SSE event id received (sent by EventSource on reconnect)",
+    ),
+    after: int = Query(
+        0,
+        ge=0,
+        description="Last SSE event id received, used without a Last-Event-ID header",
+    ),
+    stream_options: search_types.SseStreamOptions = Depends(sse_stream_options),
+) -> StreamingResponse:
+    """
+    Re-attach to a running (or just completed) stream, replaying the events
+    after the last one the client received and continuing live.
+    Args:
+        thread_id (UUID): thread id
+        track_id (UUID): track id of the stream (user message id)
+        last_event_id (Optional[int]): Last-Event-ID header
+        after (int): last event id, when the header is missing
+    Raises:
+        HTTPException: If the stream is unknown or can no longer be resumed
+    """
+    try:
+        session = infra_state.stream_manager.get_session(track_id)
+        if session is None or session.thread_id != thread_id:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=STREAM_NOT_FOUND_ERROR,
+            )
+
+        resume_after = last_event_id if last_event_id is not None else after
+        if not session.covers(resume_after):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=STREAM_REPLAY_EXPIRED_ERROR,
+            )
+
+        search_logger.info(
+            f"Resuming stream for thread_id={thread_id}, track_id={track_id} after event {resume_after}"
+        )
+        generator = infra_state.stream_manager.attach(
+            request=request,
+            session=session,
+            last_event_id=resume_after,
+            stream_options=stream_options,
+        )
+        return StreamingResponse(
+            generator,
+            media_type="text/event-stream",
+        )
+
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        search_logger.error(f"Error: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=API_ERROR_MESSAGE,
+        )
+
+
 @router.post("/{thread_id}/chat/completions/stop")
 async def stop_streaming_job(
     thread_id: UUID,
@@ -274,8 +571,8 @@ async def stop_streaming_job(
                 detail="Message not found",
             )
 
-        flag = await infra_state.stream_manager.stop_stream_message(body.track_id)
-        if not flag:
+        result = await infra_state.stream_manager.stop_stream_message(body.track_id)
+        if result == search_types.StreamCancelResult.NOT_RUNNING:
             search_logger.warning(
                 f"Failed to stop job (may have been already cancelled) track_id={body.track_id}"
             )
@@ -284,6 +581,14 @@ async def stop_streaming_job(
                 detail="Stream job already cancelled",
             )
 
+        if result == search_types.StreamCancelResult.REQUESTED:
+            # the worker running the stream could not confirm the cancellation
+            return common_types.ApiResponseModel(
+                status_code=status.HTTP_202_ACCEPTED,
+                msg="success",
+                data={"message": SEARCH_JOB_CANCEL_REQUESTED},
+            )
+
         return common_types.ApiResponseModel(
             status_code=status.HTTP_200_OK,
             msg="success",
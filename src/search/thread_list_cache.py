@@ -0,0 +1,140 @@
+"""
+In-process cache of the thread list pages (threads + total count) with ETags.
+
+Every write that changes the list invalidates the whole cache (a handful of
+pages per user session, cheaper than tracking which pages moved). With
+THREAD_LIST_CACHE_SHARED the invalidation is broadcast to the other app
+workers through a postgres NOTIFY.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Hashable, Optional, Set
+
+import orjson
+import xxhash
+
+from src.commonlib import infra_state
+from src.commonlib.config import settings
+from src.commonlib.logger import search_logger
+from src.commonlib.lru_cache import LRUCache
+
+# NOTIFY channel of thread list invalidations (empty payload)
+THREAD_LIST_CHANNEL = "thread_list_invalidate"
+
+
+@dataclass
+class CachedPage:
+    etag: str
+    data: dict
+
+
+def page_etag(data: dict) -> str:
+    """
+    Strong ETag of a response payload, identical pages share it across workers
+
+    Args:
+        data (dict): response data
+    Returns:
+        str: quoted 64-bit xxhash of the serialized data
+    """
+    return f'"{xxhash.xxh3_64_hexdigest(orjson.dumps(data))}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Args:
+        if_none_match (Optional[str]): If-None-Match request header
+        etag (str): current ETag
+    Returns:
+        bool: True when the client copy is current (weak comparison)
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class ThreadListCache:
+    """
+    Thread list pages keyed by their query parameters.
+
+    A page read from postgres is only stored when no invalidation happened
+    while it was being read (`version`), so a concurrent write never leaves a
+    stale page behind.
+    """
+
+    def __init__(self):
+        self._pages: LRUCache[CachedPage] = LRUCache(
+            max_entries=settings.THREAD_LIST_CACHE_MAX_ENTRIES,
+            ttl=settings.THREAD_LIST_CACHE_TTL_SECONDS,
+        )
+        self.version = 0
+        # running broadcasts (keeps a reference until they finish)
+        self._broadcasts: Set[asyncio.Task] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return settings.THREAD_LIST_CACHE_ENABLED
+
+    def get(self, key: Hashable) -> Optional[CachedPage]:
+        if not self.enabled:
+            return None
+        return self._pages.get(key)
+
+    def set(self, key: Hashable, data: dict, version: int) -> CachedPage:
+        """
+        Cache a page read at `version`
+
+        Args:
+            key (Hashable): page query parameters
+            data (dict): response data
+            version (int): `version` before the page was read
+        Returns:
+            CachedPage: the page with its ETag (cached or not)
+        """
+        page = CachedPage(etag=page_etag(data), data=data)
+        if self.enabled and version == self.version:
+            self._pages.set(key, page)
+        return page
+
+    def clear(self) -> None:
+        self.version += 1
+        self._pages.clear()
+
+    def on_invalidate_notification(self, payload: str) -> None:
+        """Another worker (or this one) changed the thread list"""
+        self.clear()
+
+    def invalidate(self) -> None:
+        """
+        Drop the cached pages of this worker and, when shared, broadcast the
+        invalidation to every worker in the background so callers do not wait
+        for the NOTIFY round trip (failures only leave other workers stale
+        until the ttl)
+        """
+        self.clear()
+        if not (self.enabled and settings.THREAD_LIST_CACHE_SHARED):
+            return
+        if infra_state.notify_bus is None:
+            return
+        task = asyncio.create_task(
+            infra_state.notify_bus.publish(THREAD_LIST_CHANNEL, "")
+        )
+        self._broadcasts.add(task)
+        task.add_done_callback(self._broadcast_done)
+
+    def _broadcast_done(self, task: asyncio.Task) -> None:
+        self._broadcasts.discard(task)
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            search_logger.warning(
+                f"Failed to broadcast thread list invalidation: {task.exception()}"
+            )
+
+
+thread_list_cache = ThreadListCache()
@@ -1,6 +1,6 @@
 import datetime
 from enum import StrEnum
-from typing import Annotated, Any, Dict, Literal, Optional, Union
+from typing import Annotated, Any, Dict, List, Literal, Optional, Union
 from uuid import UUID
 
 from pydantic import BaseModel, ConfigDict, Field, HttpUrl
@@ -30,6 +30,15 @@ class Message(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class PathMessage(Message):
+    """Message of the active branch with its siblings, for the branch switcher"""
+
+    # ids of the messages sharing its parent (itself included), oldest first
+    sibling_ids: List[UUID]
+    sibling_index: int
+    sibling_count: int
+
+
 AGENT_TYPES = Literal["search", "question_answering"]
 
 
@@ -74,6 +83,9 @@ class APIRequest(BaseModel):
 
 class ConversationAPIRequest(APIRequest):
     enable_search: bool = False
+    # run in the background worker pool and return immediately, the answer
+    # survives client disconnects (poll the status or re-attach to the stream)
+    detached: bool = False
     parent_message_id: Optional[UUID]
     context: Flow
 
@@ -112,6 +124,20 @@ class CompleteSource(Source):
     content: Optional[str]
 
 
+class CachedPage(BaseModel):
+    url_hash: str
+    source: CompleteSource
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    expires_at: datetime.datetime
+
+
+class DedupReport(BaseModel):
+    pages_dropped: int = 0
+    paragraphs_dropped: int = 0
+    chars_saved: int = 0
+
+
 class CustomMessage(BaseModel):
     message: Optional[str] = None
     meta: Optional[Any] = None
@@ -121,12 +147,63 @@ class SseEvent(BaseModel):
     mode: SseMode
     message: str
     meta: Optional[Dict] = None
+    # typed sources of a METADATA event for the server side (message holds the JSON)
+    sources: Optional[List[Source]] = Field(default=None, exclude=True)
     thread_id: UUID
     track_id: UUID
     um_id: UUID
     aim_id: UUID
 
 
+class SseWireFormat(StrEnum):
+    JSON = "json"
+    COMPACT = "compact"
+
+
+class StreamStatus(StrEnum):
+    RUNNING = "running"
+    COMPLETED = "completed"
+
+
+class StreamCancelResult(StrEnum):
+    CANCELLED = "cancelled"
+    NOT_RUNNING = "not_running"
+    # broadcast to the other workers, no acknowledgment could be received
+    REQUESTED = "requested"
+
+
+class StreamState(BaseModel):
+    thread_id: UUID
+    track_id: UUID
+    um_id: Optional[UUID] = None
+    aim_id: Optional[UUID] = None
+    status: StreamStatus
+    detached: bool
+    last_event_id: int
+
+
+class SseStreamOptions(BaseModel):
+    wire_format: SseWireFormat = SseWireFormat.JSON
+    # batch RESPONSE tokens into one frame per window (0 = one frame per token)
+    coalesce_ms: int = 0
+    # flush a batch early once it reaches this size (0 = no size limit)
+    coalesce_bytes: int = 0
+
+
+class TotalCount(StrEnum):
+    EXACT = "exact"
+    # planner estimate (pg_class.reltuples), for unfiltered listings only
+    ESTIMATE = "estimate"
+    NONE = "none"
+
+
+class PageCursor(BaseModel):
+    """Keyset position: sort timestamp and id of the last row of a page"""
+
+    position: datetime.datetime
+    id: UUID
+
+
 class FeedbackReaction(StrEnum):
     LIKE = "like"
     DISLIKE = "dislike"